@@ -0,0 +1,50 @@
+"""
+Created on Sun Oct 18 2026
+
+Compressed LAMMPS data files, chosen by file name suffix
+
+Input:
+    Path ending in .gz, .xz or .zst (the latter needs the zstandard package,
+    or compression.zstd of Python 3.14)
+
+Output:
+    Binary file object (de)compressing on the fly
+
+@author: Ilia Nikiforov
+"""
+import gzip
+import lzma
+import os
+
+# gzip's own default, level 9 is several times slower for a few percent smaller files
+GZIP_LEVEL = 6
+
+def _open_zst(filename, mode):
+    try:
+        from compression import zstd
+        return zstd.open(filename, mode)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError ("Reading or writing "+str(filename)+" needs the zstandard package")
+    return zstandard.open(filename, mode)
+
+# Suffix -> function opening a path in binary mode 'rb' or 'wb'
+COMPRESSED_SUFFIXES = {
+    '.gz': lambda filename, mode: gzip.open(filename, mode, compresslevel=GZIP_LEVEL),
+    '.xz': lzma.open,
+    '.zst': _open_zst,
+}
+
+def compression_suffix(filename):
+    """ Suffix of a compressed path ('.gz', '.xz', '.zst'), None for file objects and uncompressed paths """
+    if not isinstance(filename, (str, os.PathLike)):
+        return None
+    suffix = os.path.splitext(os.fspath(filename))[1]
+    return suffix if suffix in COMPRESSED_SUFFIXES else None
+
+def open_compressed(filename, mode):
+    """ Open a compressed path in binary mode 'rb' or 'wb' """
+    return COMPRESSED_SUFFIXES[compression_suffix(filename)](filename, mode)
@@ -0,0 +1,54 @@
+"""
+Created on Sun Oct 18 2026
+
+Merge bonded interaction types that share the same label
+
+Input:
+    Interactions of one kind (bond, angle, dihedral or improper)
+
+Output:
+    Deduplicated labels and coefficients, interaction rows renumbered
+
+@author: Ilia Nikiforov
+"""
+import numpy as np
+
+def _label_keys(type_label):
+    """ One int64 per label row packing its codes if they fit, which np.unique sorts much faster than rows; else the rows """
+    bits = max(int(type_label.max()).bit_length(), 1)
+    if bits*type_label.shape[1] > 63:
+        return type_label
+    shifts = np.arange(type_label.shape[1], dtype=np.int64)*bits
+    return (type_label.astype(np.int64) << shifts).sum(axis=1)
+
+##################################################################
+# CANONICAL LABEL TABLE OF ONE INTERACTION KIND
+##################################################################
+def type_label_remap(type_label, type_coeff):
+    """ Keep the first type of every distinct label (row of an integer-coded label array), return kept labels, coefficients and the old -> new type id lookup """
+    # remap[old_type_id] = new_type_id, index 0 unused
+    remap = np.zeros(len(type_label)+1, dtype=np.intp)
+    if len(type_label) == 0:
+        return type_label, type_coeff, remap
+
+    # Distinct label rows, the first type having each and the distinct row of every type
+    _, first, inverse = np.unique(_label_keys(type_label), axis=0, return_index=True, return_inverse=True)
+    # New type ids (1-based) follow the order of first appearance
+    order = np.argsort(first)
+    new_id = np.empty(len(order), dtype=np.intp)
+    new_id[order] = np.arange(1, len(order)+1)
+    remap[1:] = new_id[inverse.ravel()]
+
+    keep = first[order]
+    return type_label[keep], type_coeff[keep], remap
+
+##################################################################
+# DEDUPLICATE TYPE LABELS OF ONE INTERACTION KIND
+##################################################################
+def dedup_type_labels(interactions):
+    """ Merge types of an Interactions sharing a label and renumber its rows, in place """
+    interactions.label, interactions.coeff, remap = type_label_remap(interactions.label, interactions.coeff)
+
+    # Replace type_id of every interaction with a single lookup
+    if interactions.rows is not None and len(interactions.rows) > 0:
+        interactions.rows['type'] = remap[interactions.rows['type']]
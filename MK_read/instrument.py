@@ -0,0 +1,116 @@
+"""
+Created on Sun Oct 18 2026
+
+Opt-in per-stage timing and memory report of a conversion
+
+Input:
+    StageReport passed as report= to convert() or dump_dat()
+
+Output:
+    Wall time, rows, rows/s and memory of every stage, as a dict, JSON or logging records
+
+@author: Ilia Nikiforov
+"""
+import contextlib
+import json
+import logging
+import os
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:
+    # Unix only, peak RSS is not reported elsewhere
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+def _rss_mb():
+    """ Current resident set size [MB], None where /proc is not available """
+    try:
+        with open('/proc/self/statm') as fstatm:
+            return int(fstatm.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _max_rss_mb():
+    """ Peak resident set size of this process [MB], None where the resource module is not available """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+##################################################################
+# STAGE REPORT
+##################################################################
+class StageReport:
+    """
+    Per-stage records of one or more conversions, stages entered again accumulate time and rows
+    Args:
+        trace_memory: also record the peak of Python/NumPy allocations per stage with tracemalloc (slows conversion down)
+    """
+    def __init__(self,trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self,name,rows=0):
+        """ Time the body as stage name, the yielded dict takes 'rows' processed if not known upfront """
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        counts = {'rows': rows}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            seconds = time.perf_counter()-start
+            peak_traced = tracemalloc.get_traced_memory()[1]/2**20 if self.trace_memory else None
+            if tracing:
+                tracemalloc.stop()
+            self._add(name,seconds,counts['rows'],peak_traced)
+
+    def iterate(self,name,chunks):
+        """ Yield the chunks (arrays of rows) of an iterable, timing the production of each one as stage name """
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name) as counts:
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                counts['rows'] = len(chunk)
+            yield chunk
+
+    def _add(self,name,seconds,rows,peak_traced):
+        record = self.stages.setdefault(name, {'stage': name, 'seconds': 0.0, 'rows': 0, 'peak_traced_mb': None})
+        record['seconds'] += seconds
+        record['rows'] += rows
+        record['rows_per_second'] = record['rows']/record['seconds'] if record['seconds'] > 0 else 0.0
+        if peak_traced is not None:
+            record['peak_traced_mb'] = max(record['peak_traced_mb'] or 0.0, peak_traced)
+        record['rss_mb'] = _rss_mb()
+        record['max_rss_mb'] = _max_rss_mb()
+
+    def as_dict(self):
+        """ Stage records in the order the stages were first entered, and their total time """
+        stages = list(self.stages.values())
+        return {'stages': stages, 'seconds': sum(record['seconds'] for record in stages)}
+
+    def to_json(self,**kwargs):
+        return json.dumps(self.as_dict(),**kwargs)
+
+    def log(self,level=logging.INFO):
+        """ Emit one logging record per stage, with the stage record as extra fields """
+        for record in self.stages.values():
+            max_rss = 'n/a' if record['max_rss_mb'] is None else '%.1f MB' % record['max_rss_mb']
+            logger.log(level,'%s: %.3f s, %d rows (%.0f rows/s), max RSS %s',
+                       record['stage'],record['seconds'],record['rows'],record['rows_per_second'],max_rss,
+                       extra={'conversion_stage': record})
+
+def stage(report,name,rows=0):
+    """ report.stage(name, rows), or a no-op context yielding a throwaway dict if report is None """
+    if report is None:
+        return contextlib.nullcontext({'rows': rows})
+    return report.stage(name,rows)
@@ -8,157 +8,205 @@ Reconstruction of data file with labels
 @author: Moon-ki Choi
 """
 
-from .read_LAMMPS_data import read_LAMMPS_bonded
-from .write_LAMMPS_data import write_LAMMPS_bonded_label_v2
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import tempfile
+from .read_LAMMPS_data import read_LAMMPS_bonded, open_LAMMPS_input, index_LAMMPS_sections, read_LAMMPS_types, iter_LAMMPS_section, \
+        topology_fingerprint, source_name, seeks_cheaply, walk_LAMMPS_sections, iter_section_rows
+from .write_LAMMPS_data import write_LAMMPS_bonded_label_v2, open_LAMMPS_output, write_LAMMPS_head_label, \
+        write_LAMMPS_atom_rows, write_LAMMPS_interaction_rows, ROW_FORMAT
+from .dedup_LAMMPS_data import dedup_type_labels, type_label_remap
+from .topology import INTERACTION_SECTIONS, Topology, load_topology
+from .instrument import stage
 
-def dump_dat(dat_in,dat_out):
-    """ Read LAMMPS bonded file """ 
-    num_atom,num_bond,num_angle,num_dihedral,num_atom_type,num_bond_type,num_angle_type,num_dihedral_type, \
-            xlo,xhi,ylo,yhi,zlo,zhi,mass,labels,pair_coeff,atom,bond_coeff,bond_label,bond,angle_coeff,angle_label,angle,dihedral_coeff,dihedral_label,dihedral = read_LAMMPS_bonded(dat_in)
+# Rows held in memory per section in streaming mode
+CHUNK_SIZE = 100000
 
-    """ Create label list for atoms """
-    label_list = []
-    for i in range(num_atom):
-        # Find label for each atom based on atom type 
-        label = labels[int(atom[i,1]-1)] 
-        label_list.append(label)
+# Bytes copied per read when spooling an input to a temporary file
+SPOOL_BLOCK = 2**20
+
+def label_topology(dat_in,use_mmap=False,workers=1,report=None):
+    """
+    Topology of dat_in with bonded types sharing a label merged, nothing is written
+    Args:
+        dat_in: path, bytes or seekable file object (text or binary) of a data file, a Topology with rows
+            (deduplicated in place), or the path of a .npz file written by save_topology
+        use_mmap, workers, report: as for dump_dat
+    """
+    if isinstance(dat_in,Topology):
+        topology = dat_in
+    elif isinstance(dat_in,(str,os.PathLike)) and os.fspath(dat_in).endswith('.npz'):
+        """ Load parsed topology """
+        with stage(report,'load') as counts:
+            topology = load_topology(dat_in)
+            counts['rows'] = _num_rows(topology)
+    else:
+        """ Read LAMMPS bonded file """ 
+        with stage(report,'parse') as counts:
+            topology = read_LAMMPS_bonded(dat_in,pair_coeff=False,use_mmap=use_mmap,workers=workers)
+            counts['rows'] = _num_rows(topology)
 
     """ Overlapping label checking process """
     """ This section will find overlapping label type and remove it """
-    check_flag = 1
-    if (check_flag == 1): 
-        # Bond check 
-        bond_label_tmp = []
-        bond_coeff_tmp = []
-        num_bond_type_tmp = num_bond_type
-        for i in range(num_bond_type_tmp):
-            ovr_flag = 0 
-            curr1 = bond_label[i][0]
-            curr2 = bond_label[i][1]
-            coeff1 = bond_coeff[i][0]
-            coeff2 = bond_coeff[i][1]
-            if (i > 0):
-                for j in range(i):
-                    tmp1 = bond_label[j][0]
-                    tmp2 = bond_label[j][1]
-                    # Overlapped case 
-                    if curr1 == tmp1 and curr2 == tmp2:
-                        # If label is already replaced, continue
-                        if ovr_flag == 1:
-                            continue
-                        ovr_flag = 1
-                        # Reduce num_bond
-                        num_bond_type = num_bond_type - 1
-            if (ovr_flag==0):
-                bond_label_tmp.append([curr1,curr2])
-                bond_coeff_tmp.append([coeff1,coeff2])
-        # Replace type_id in bond with new one
-        for i in range(num_bond):
-            tmd_id = int(bond[i][0])
-            curr1 = bond_label[tmd_id-1][0]
-            curr2 = bond_label[tmd_id-1][1]
-            for j in range(len(bond_label_tmp)):
-                tmp1 = bond_label_tmp[j][0]
-                tmp2 = bond_label_tmp[j][1]
-                if curr1 == tmp1 and curr2 == tmp2:
-                    bond[i][0] = j+1
-        bond_label = bond_label_tmp
-        bond_coeff = bond_coeff_tmp
-                        
-        # Angle check 
-        angle_label_tmp = []
-        angle_coeff_tmp = []
-        num_angle_type_tmp = num_angle_type
-        for i in range(num_angle_type_tmp):
-            ovr_flag = 0 
-            curr1 = angle_label[i][0]
-            curr2 = angle_label[i][1]
-            curr3 = angle_label[i][2]
-            coeff1 = angle_coeff[i][0]
-            coeff2 = angle_coeff[i][1]
-            coeff3 = angle_coeff[i][2]
-            coeff4 = angle_coeff[i][3]
-            if (i > 0):
-                for j in range(i):
-                    tmp1 = angle_label[j][0]
-                    tmp2 = angle_label[j][1]
-                    tmp3 = angle_label[j][2]
-                    # Overlapped case 
-                    if curr1 == tmp1 and curr2 == tmp2 and curr3 == tmp3:
-                        # If label is already replaced, continue
-                        if ovr_flag == 1:
-                            continue
-                        ovr_flag = 1
-                        # Reduce num_angle
-                        num_angle_type = num_angle_type - 1
-            if (ovr_flag==0):
-                angle_label_tmp.append([curr1,curr2,curr3])
-                angle_coeff_tmp.append([coeff1,coeff2,coeff3,coeff4])
-        # Replace type_id in angle with new one
-        for i in range(num_angle):
-            tmd_id = int(angle[i][0])
-            curr1 = angle_label[tmd_id-1][0]
-            curr2 = angle_label[tmd_id-1][1]
-            curr3 = angle_label[tmd_id-1][2]
-            for j in range(len(angle_label_tmp)):
-                tmp1 = angle_label_tmp[j][0]
-                tmp2 = angle_label_tmp[j][1]
-                tmp3 = angle_label_tmp[j][2]
-                if curr1 == tmp1 and curr2 == tmp2 and curr3 == tmp3:
-                    angle[i][0] = j+1
-        angle_label = angle_label_tmp
-        angle_coeff = angle_coeff_tmp
-        
-        # Dihedral check 
-        dihedral_label_tmp = []
-        dihedral_coeff_tmp = []
-        num_dihedral_type_tmp = num_dihedral_type
-        for i in range(num_dihedral_type_tmp):
-            ovr_flag = 0 
-            curr1 = dihedral_label[i][0]
-            curr2 = dihedral_label[i][1]
-            curr3 = dihedral_label[i][2]
-            curr4 = dihedral_label[i][3]
-            coeff1 = dihedral_coeff[i][0]
-            coeff2 = dihedral_coeff[i][1]
-            coeff3 = dihedral_coeff[i][2]
-            coeff4 = dihedral_coeff[i][3]
-            if (i > 0):
-                for j in range(i):
-                    tmp1 = dihedral_label[j][0]
-                    tmp2 = dihedral_label[j][1]
-                    tmp3 = dihedral_label[j][2]
-                    tmp4 = dihedral_label[j][3]
-                    # Overlapped case 
-                    if curr1 == tmp1 and curr2 == tmp2 and curr3 == tmp3 and curr4 == tmp4:
-                        # If label is already replaced, continue
-                        if ovr_flag == 1:
-                            continue
-                        ovr_flag = 1
-                        # Reduce num_dihedral
-                        num_dihedral_type = num_dihedral_type - 1
-            if (ovr_flag==0):
-                dihedral_label_tmp.append([curr1,curr2,curr3,curr4])
-                dihedral_coeff_tmp.append([coeff1,coeff2,coeff3,coeff4])
-        # Replace type_id in dihedral with new one
-        for i in range(num_dihedral):
-            tmd_id = int(dihedral[i][0])
-            curr1 = dihedral_label[tmd_id-1][0]
-            curr2 = dihedral_label[tmd_id-1][1]
-            curr3 = dihedral_label[tmd_id-1][2]
-            curr4 = dihedral_label[tmd_id-1][3] 
-            for j in range(len(dihedral_label_tmp)):
-                tmp1 = dihedral_label_tmp[j][0]
-                tmp2 = dihedral_label_tmp[j][1]
-                tmp3 = dihedral_label_tmp[j][2]
-                tmp4 = dihedral_label_tmp[j][3]
-                if curr1 == tmp1 and curr2 == tmp2 and curr3 == tmp3 and curr4 == tmp4:
-                    #print("found",j+1)
-                    dihedral[i][0] = j+1
-        dihedral_label = dihedral_label_tmp
-        dihedral_coeff = dihedral_coeff_tmp
-        # Improper check 
+    with stage(report,'dedup',_num_rows(topology)-len(topology.atom)):
+        for kind, interactions in topology.interactions():
+            dedup_type_labels(interactions)
+    return topology
+
+def dump_dat(dat_in,dat_out,stream=False,chunk_size=CHUNK_SIZE,use_mmap=False,workers=1,report=None,bonded_cache=None,
+             write_workers=None):
+    """
+    Rewrite LAMMPS data file dat_in with type labels to dat_out
+    Args:
+        dat_in: path, bytes or seekable file object (text or binary) of a data file, a Topology with rows
+            (deduplicated in place), or the path of a .npz file written by save_topology
+        dat_out: path, or text/binary file object written to at its current position and left open
+        stream: convert chunk by chunk so that memory does not grow with system size (data file inputs only)
+        chunk_size: rows per chunk in streaming mode
+        use_mmap: memory-map dat_in (a path or a file object backed by a file) and parse sections from the mapping
+        workers: cores parsing the Atoms and bonded sections, None uses all available CPUs (ignored in streaming mode)
+        report: StageReport to record the time and memory of the parse, dedup and write stages in, None for no instrumentation
+        bonded_cache: cache of the bonded sections of earlier conversions (e.g. a ConversionCache), keyed by topology_fingerprint.
+            If dat_in has the same topology as an earlier conversion, only the header and Atoms are converted, the bonded
+            sections are copied. Implies streaming mode for data file inputs, needs a dat_out path
+        write_workers: processes formatting the rows of the output, None uses all available CPUs (ignored in streaming mode)
+    """
+    is_data_file = not isinstance(dat_in,Topology) and \
+        not (isinstance(dat_in,(str,os.PathLike)) and os.fspath(dat_in).endswith('.npz'))
+    if is_data_file and (stream or bonded_cache is not None):
+        if bonded_cache is not None and not isinstance(dat_out,(str,os.PathLike)):
+            raise RuntimeError ("Incremental conversion of "+source_name(dat_in)+" needs an output path")
+        _dump_dat_stream(dat_in,dat_out,chunk_size,use_mmap,report,bonded_cache)
+        return
+
+    topology = label_topology(dat_in,use_mmap=use_mmap,workers=workers,report=report)
 
     """ Write LAMMPS data file with labels """     
-    write_LAMMPS_bonded_label_v2(dat_out,num_atom,num_bond,num_angle,num_dihedral,num_atom_type,num_bond_type,num_angle_type,num_dihedral_type, \
-            xlo,xhi,ylo,yhi,zlo,zhi,labels,atom,bond_label,bond,angle_label,angle,dihedral_label,dihedral)
\ No newline at end of file
+    with stage(report,'write',_num_rows(topology)):
+        write_LAMMPS_bonded_label_v2(dat_out,topology,workers=write_workers)
+
+def render_dat(dat_in,**kwargs):
+    """ LAMMPS data file with type labels converted from dat_in as a BytesIO at position 0, kwargs as for dump_dat """
+    dat_out = io.BytesIO()
+    dump_dat(dat_in,dat_out,**kwargs)
+    dat_out.seek(0)
+    return dat_out
+
+def _num_rows(topology):
+    """ Atom and interaction rows of a Topology """
+    return len(topology.atom)+sum(len(interactions.rows) for kind, interactions in topology.interactions())
+
+def _dump_dat_stream(dat_in,dat_out,chunk_size,use_mmap,report=None,bonded_cache=None):
+    with open_LAMMPS_input(dat_in,use_mmap) as fin:
+        if seeks_cheaply(fin):
+            _dump_dat_indexed(fin,source_name(dat_in),dat_out,chunk_size,report,bonded_cache)
+        elif bonded_cache is None:
+            _dump_dat_walk(fin,source_name(dat_in),dat_out,chunk_size,report)
+        else:
+            """ The fingerprint needs the whole input before the bonded sections, decompress it once to a temporary file """
+            with tempfile.TemporaryFile() as spool:
+                with stage(report,'spool'):
+                    shutil.copyfileobj(fin,spool,SPOOL_BLOCK)
+                spool.seek(0)
+                _dump_dat_indexed(spool,source_name(dat_in),dat_out,chunk_size,report,bonded_cache)
+
+def _dump_dat_indexed(fin,name,dat_out,chunk_size,report=None,bonded_cache=None):
+    """ Streaming conversion of an input that seeks cheaply, reading each section from its indexed position """
+    """ Index sections and read coefficients only """
+    with stage(report,'index'):
+        index = index_LAMMPS_sections(fin,name)
+        topology = read_LAMMPS_types(fin,index,pair_coeff=False)
+
+    """ Identify the topology for reusing bonded sections """
+    fingerprint = None
+    if bonded_cache is not None:
+        with stage(report,'fingerprint'):
+            fingerprint = topology_fingerprint(fin,index)
+
+    remap = _type_remap(topology,report)
+
+    """ Pipe rows through to the LAMMPS data file with labels """
+    with open_LAMMPS_output(dat_out) as fout:
+        write_LAMMPS_head_label(fout,topology)
+        _write_section(fout,'Atoms',None,iter_LAMMPS_section(fin,index,'Atoms',chunk_size),remap,report)
+
+        if fingerprint is not None:
+            # Offset the bonded sections start at, dat_out is a path here (checked by dump_dat)
+            fout.flush()
+            bonded_start = fout.buffer.tell()
+            with stage(report,'cache'):
+                reused = bonded_cache.fetch_bonded(fingerprint,fout.buffer)
+            if reused:
+                return
+        for section, kind in _output_sections(topology)[1:]:
+            _write_section(fout,section,kind,iter_LAMMPS_section(fin,index,section,chunk_size),remap,report)
+
+    if fingerprint is not None:
+        with stage(report,'cache'):
+            bonded_cache.store_bonded(fingerprint,dat_out,bonded_start)
+
+def _dump_dat_walk(fin,name,dat_out,chunk_size,report=None):
+    """
+    Streaming conversion of an input decompressed on the fly, in a single front-to-back pass. Row sections
+    met before the coefficient sections the header needs, or ahead of their place in the output, are
+    spooled to temporary files and converted once their turn comes
+    """
+    sections = None
+    num_written = 0
+    spooled = {}
+    with open_LAMMPS_output(dat_out) as fout, contextlib.ExitStack() as spools:
+        for item in walk_LAMMPS_sections(fin,name,pair_coeff=False):
+            if isinstance(item,Topology):
+                topology = item
+                remap = _type_remap(topology,report)
+                write_LAMMPS_head_label(fout,topology)
+                sections = _output_sections(topology)
+            elif sections is not None and sections[num_written][0] == item.keyword:
+                _write_section(fout,item.keyword,sections[num_written][1],iter_section_rows(item,name,chunk_size),remap,report)
+                num_written += 1
+            else:
+                with stage(report,'spool',item.num_rows):
+                    spool = spools.enter_context(tempfile.TemporaryFile())
+                    spool.writelines(itertools.islice(item.lines,item.num_rows))
+                    spool.seek(0)
+                spooled[item.keyword] = item._replace(lines=iter(spool.readline,b''))
+            """ Catch up with sections spooled while waiting for their turn """
+            while sections is not None and num_written < len(sections) and sections[num_written][0] in spooled:
+                section, kind = sections[num_written]
+                _write_section(fout,section,kind,iter_section_rows(spooled.pop(section),name,chunk_size),remap,report)
+                num_written += 1
+
+def _type_remap(topology,report=None):
+    """ Merge the label tables of a Topology without rows in place, return old -> new type id lookups of every kind """
+    remap = {}
+    with stage(report,'dedup'):
+        for kind, interactions in topology.interactions():
+            interactions.label, interactions.coeff, remap[kind] = type_label_remap(interactions.label, interactions.coeff)
+    return remap
+
+def _output_sections(topology):
+    """ (section, kind) of the Atoms (kind None) and bonded sections in output order """
+    return [('Atoms',None)]+[(INTERACTION_SECTIONS[kind][2],kind) for kind, interactions in topology.interactions()
+                             if interactions.num_type > 0]
+
+def _write_section(fout,section,kind,chunks,remap,report=None):
+    """ Write the Atoms (kind None) or a bonded section from chunks of rows, renumbering bonded types with remap """
+    fout.write('\n'+section+'\n\n')
+    first_id = 1
+    for rows in _chunks(report,chunks):
+        if kind is None:
+            with stage(report,'write',len(rows)):
+                write_LAMMPS_atom_rows(fout,rows,first_id)
+        else:
+            with stage(report,'dedup',len(rows)):
+                rows['type'] = remap[kind][rows['type']]
+            with stage(report,'write',len(rows)):
+                write_LAMMPS_interaction_rows(fout,ROW_FORMAT[kind],rows,first_id)
+        first_id += len(rows)
+
+def _chunks(report,chunks):
+    """ Chunks of rows, timed as the parse stage if instrumented """
+    return chunks if report is None else report.iterate('parse',chunks)
@@ -7,255 +7,548 @@ Input:
     Name of LAMMPS data file
     
 Output: 
-    Structure data
+    Structure data (Topology)
     
 @author: Moon-ki Choi, Ilia Nikiforov
 """
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import io
+import itertools
+import mmap
+import os
+import re
+import warnings
 import numpy as np
+from .compression import compression_suffix, open_compressed
+from .topology import Topology, Interactions, LabelRegistry, ATOM_DTYPE, INTERACTION_SECTIONS, interaction_dtype
+
+# Columns kept from the rows of each large section and their dtype
+# Atoms: molecule-tag, type, charge, x, y, z. Bonded sections: type, ID_1, ID_2, ...
+SECTION_COLUMNS = {'Atoms': ((1,2,3,4,5,6), ATOM_DTYPE)}
+for _, _, _section, _num_atoms in INTERACTION_SECTIONS.values():
+    SECTION_COLUMNS[_section] = (tuple(range(1,_num_atoms+2)), interaction_dtype(_num_atoms))
+
+# Header count giving the number of rows of each section
+SECTION_COUNTS = {'Masses': 'atom types', 'Pair Coeffs': 'atom types', 'Atoms': 'atoms', 'Velocities': 'atoms'}
+for _kind, (_coeff_section, _, _section, _) in INTERACTION_SECTIONS.items():
+    SECTION_COUNTS[_coeff_section] = _kind+' types'
+    SECTION_COUNTS[_section] = _kind+'s'
+
+# Coefficients and type label names per row of each coefficient section (Pair Coeffs: Epsilon, Sigma)
+COEFF_COLUMNS = {'Masses': (1,1), 'Pair Coeffs': (2,0)}
+for _coeff_section, _num_coeff, _, _num_atoms in INTERACTION_SECTIONS.values():
+    COEFF_COLUMNS[_coeff_section] = (_num_coeff,_num_atoms)
+
+# Section headers are the only lines starting with a letter (written at column 0
+# by CHARMM-GUI and LAMMPS write_data; allowing indentation makes the scan 3x slower)
+SECTION_HEADER = re.compile(rb'\n[A-Za-z]')
+
+# Bytes scanned per read while indexing
+INDEX_BLOCK = 2**24
+
+# Sections left out of the topology fingerprint, they are converted again every time
+FINGERPRINT_EXCLUDED = ('Atoms', 'Velocities')
+
+# Bytes of a memory-mapped section parsed per np.loadtxt call
+MMAP_PIECE = 2**24
+
+# Pieces a section is split into per worker when parsing in parallel, and their smallest size in bytes
+PIECES_PER_WORKER = 4
+MIN_PARALLEL_PIECE = 2**16
+
+# Rows per piece when parsing a section of a stream read front to back in parallel, at most (about MMAP_PIECE
+# bytes of bonded rows) and at least
+STREAM_PIECE_ROWS = 2**18
+MIN_PARALLEL_ROWS = 2**10
+
+# Byte range [start, end) after the header line of a section, and its number of rows (None if unknown)
+Section = collections.namedtuple('Section', 'start end num_rows')
+
+# Header counts ("atoms", "bond types", ...), box, and Section of every section keyword of one file
+SectionIndex = collections.namedtuple('SectionIndex', 'name counts box sections')
+
+# Rows of the Atoms or a bonded section met by walk_LAMMPS_sections: keyword, header count, iterator over its lines
+SectionRows = collections.namedtuple('SectionRows', 'keyword num_rows lines')
+
+# Process pool parsing section pieces, its number of workers, and the path workers read their pieces from (None: pieces are sent as bytes)
+ParsePool = collections.namedtuple('ParsePool', 'executor workers source')
 
 ##################################################################
-# READ LAMMPS BONDED DATA FILE
+# OPEN INPUT
 ##################################################################
-def read_LAMMPS_bonded(filename):
-    """ Read LAMMPS topology file """
-    fopen = open(filename, "r")
-    
-    # End of box data flag 
-    eof_box = 0
-    while (eof_box == 0):
+@contextlib.contextmanager
+def open_LAMMPS_input(source, use_mmap=False):
+    """
+    Yield a seekable binary stream over a path, or over a binary/text file object rewound to its start
+    With use_mmap, paths (and file objects backed by a file) are memory-mapped and an mmap is yielded
+    Paths ending in .gz/.xz/.zst are decompressed on the fly, never memory-mapped, bytes are read in memory
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+        return
+    if compression_suffix(source) is not None:
+        with open_compressed(source, "rb") as fopen:
+            yield fopen
+        return
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fopen:
+            if use_mmap:
+                with mmap.mmap(fopen.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    yield buf
+            else:
+                yield fopen
+        return
+    if use_mmap:
+        try:
+            fileno = source.fileno()
+        except (AttributeError, OSError):
+            # e.g. a member of a tar archive, fall through to reading it as a stream
+            fileno = None
+        if fileno is not None:
+            with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buf:
+                yield buf
+            return
+    source.seek(0)
+    if isinstance(source, io.TextIOBase):
+        if hasattr(source, 'buffer'):
+            source.buffer.seek(0)
+            yield source.buffer
+        else:
+            yield io.BytesIO(source.read().encode('utf-8'))
+        return
+    yield source
+
+def seeks_cheaply(fopen):
+    """
+    Whether seeking back in an opened input is cheap: an mmap, in-memory or plain file stream. Streams
+    decompressed on the fly (compressed paths, members of compressed tar archives) decompress everything
+    again from the start, they are read front to back with walk_LAMMPS_sections instead
+    """
+    if isinstance(fopen, (mmap.mmap, io.BytesIO, io.FileIO)):
+        return True
+    return isinstance(getattr(fopen, 'raw', None), io.FileIO)
+
+def source_name(source):
+    """ Name of an input for messages: the path, the name of a file object, or its type """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return str(getattr(source, 'name', '<'+type(source).__name__+'>'))
+
+def available_cpus():
+    """ Number of CPUs this process may run on, which is less than os.cpu_count() under taskset, cgroups or a batch scheduler """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+@contextlib.contextmanager
+def open_parse_pool(source, workers):
+    """
+    Yield a ParsePool of workers for parsing the sections of source, or None for serial parsing
+    Worker processes read their pieces of uncompressed paths from the file, pieces of other sources are sent to them as bytes
+    """
+    if workers is None:
+        workers = available_cpus()
+    if workers <= 1:
+        yield None
+        return
+    path = isinstance(source, (str, os.PathLike)) and compression_suffix(source) is None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        yield ParsePool(executor, workers, os.fspath(source) if path else None)
+
+##################################################################
+# ONE-PASS SECTION INDEX
+##################################################################
+def _decode(line):
+    """ Text of a line, parsing only needs ASCII but comments and the title may hold any text, in any encoding """
+    return line.decode('utf-8', errors='replace')
+
+def _read_header(fopen, name):
+    """ Read counts ("3000 atoms", "30 bond types", ...) and box size at the top of the file """
+    counts = {}
+    box = np.zeros((3,2))
+    # The first line is the title, whatever it holds
+    fopen.readline()
+    while True:
         curr_line = fopen.readline()
-        curr_line_split = curr_line.split()
-        if (len(curr_line_split) > 1):
-            # Number of atom 
-            if (curr_line_split[1] == 'atoms'): 
-                num_atom = int(curr_line_split[0])
-            # Number of bonds
-            if (curr_line_split[1] == 'bonds'): 
-                num_bond = int(curr_line_split[0])
-            # Number of angles
-            if (curr_line_split[1] == 'angles'): 
-                num_angle = int(curr_line_split[0])
-            # Number of dihedral
-            if (curr_line_split[1] == 'dihedrals'): 
-                num_dihedral = int(curr_line_split[0])
-            # Number of atom types 
-            if ((curr_line_split[1] == 'atom') and (curr_line_split[2] == 'types')): 
-                num_atom_type = int(curr_line_split[0])
-            # Number of bond types 
-            if ((curr_line_split[1] == 'bond') and (curr_line_split[2] == 'types')): 
-                num_bond_type = int(curr_line_split[0])
-            # Number of bond types 
-            if ((curr_line_split[1] == 'angle') and (curr_line_split[2] == 'types')): 
-                num_angle_type = int(curr_line_split[0])
-            # Number of bond types 
-            if ((curr_line_split[1] == 'dihedral') and (curr_line_split[2] == 'types')): 
-                num_dihedral_type = int(curr_line_split[0]) 
-        if (len(curr_line_split) > 2):
+        if curr_line == b'':
+            raise RuntimeError("No zlo zhi line in "+name)
+        curr_line_split = _decode(curr_line.split(b'#')[0]).split()
+        if (len(curr_line_split) == 4) and (curr_line_split[2][1:] == 'lo') and (curr_line_split[3][1:] == 'hi'):
             # Read box size  
-            if ((curr_line_split[2] == 'xlo') and (curr_line_split[3] == 'xhi')): 
-                xlo = np.double(curr_line_split[0]); xhi = np.double(curr_line_split[1])
-            if ((curr_line_split[2] == 'ylo') and (curr_line_split[3] == 'yhi')): 
-                ylo = np.double(curr_line_split[0]); yhi = np.double(curr_line_split[1])
-            if ((curr_line_split[2] == 'zlo') and (curr_line_split[3] == 'zhi')): 
-                zlo = np.double(curr_line_split[0]); zhi = np.double(curr_line_split[1])
-                # End of reading box size 
-                eof_box = 1
-        
-    # Read mass data
-    eof_mass = 0 # End of mass data flag 
-    while (eof_mass == 0):
-        curr_line = fopen.readline()
-        curr_line_split = curr_line.split()
-        # Masses d
-        if (len(curr_line_split) > 0): 
-            if (curr_line_split[0] == 'Masses'): 
-                fopen.readline()
-                mass = np.zeros(num_atom_type)
-                labels = []
-                for i in range(num_atom_type):
-                    curr_line = fopen.readline()
-                    curr_line_split = curr_line.split()
-                    mass[i] = np.double(curr_line_split[1])
-                    labels.append(curr_line_split[3])
-                # End of mass data
-                eof_mass = 1
-    
-    # Read pair coefficients
-    eof_pair_coeffs = 0 # End of pair coefficients 
-    while (eof_pair_coeffs == 0): 
-        curr_line = fopen.readline()
-        curr_line_split = curr_line.split()
-        # Masses d
-        if (len(curr_line_split) > 0): 
-            if (curr_line_split[0] == 'Pair'): 
-                fopen.readline()
-                pair_coeff = np.zeros((num_atom_type,2))
-                for i in range(num_atom_type):
-                    curr_line = fopen.readline()
-                    curr_line_split = curr_line.split()
-                    pair_coeff[i,0] = np.double(curr_line_split[1]) # Epsilon 
-                    pair_coeff[i,1] = np.double(curr_line_split[2]) # Sigma 
-                # End of pair coefficients 
-                eof_pair_coeffs = 1    
-                
-    # Read atom data 
-    eof_atom = 0 # End of atom 
-    while (eof_atom == 0): 
+            axis = 'xyz'.index(curr_line_split[2][0])
+            box[axis,0] = np.double(curr_line_split[0]); box[axis,1] = np.double(curr_line_split[1])
+            # End of reading box size 
+            if axis == 2:
+                return counts, box
+        elif (len(curr_line_split) > 1) and curr_line_split[0].isdigit():
+            # Number of atoms/bonds/..., number of atom/bond/... types 
+            counts[' '.join(curr_line_split[1:])] = int(curr_line_split[0])
+
+def _scan_headers(fopen):
+    """ Yield keyword, offset of the header line and offset after the header line of every section after the current position """
+    if isinstance(fopen, mmap.mmap):
+        # Search the mapped file in place
+        for match in SECTION_HEADER.finditer(fopen, fopen.tell()-1):
+            line_end = fopen.find(b'\n', match.end())
+            if line_end < 0:
+                line_end = len(fopen)
+            keyword = _decode(fopen[match.start()+1:line_end].split(b'#')[0].strip())
+            yield keyword, match.start()+1, line_end+1
+        if hasattr(fopen, 'madvise'):
+            # Drop the scanned pages from the resident set, sections are faulted in again when parsed
+            fopen.madvise(mmap.MADV_DONTNEED)
+        return
+
+    # Start from the newline ending the zlo zhi line so that a header on the next line is found
+    carry = b'\n'
+    base = fopen.tell()-1
+    eof = False
+    while not eof:
+        block = fopen.read(INDEX_BLOCK)
+        eof = (block == b'')
+        buf = carry+block+(b'\n' if eof else b'')
+        # Only look at complete lines, the partial last line is carried over
+        cut = buf.rfind(b'\n')
+        for match in SECTION_HEADER.finditer(buf, 0, cut):
+            line_end = buf.find(b'\n', match.end())
+            keyword = _decode(buf[match.start()+1:line_end].split(b'#')[0].strip())
+            yield keyword, base+match.start()+1, base+line_end+1
+        carry = buf[cut:]
+        base += cut
+
+def index_LAMMPS_sections(fopen, name=None):
+    """ Read the header of a binary stream or mmap and record where every section starts, in one pass over the file """
+    name = str(name if name is not None else getattr(fopen, 'name', fopen))
+    counts, box = _read_header(fopen, name)
+
+    headers = list(_scan_headers(fopen))
+    size = len(fopen) if isinstance(fopen, mmap.mmap) else fopen.tell()
+
+    sections = {}
+    for i, (keyword, _, start) in enumerate(headers):
+        end = headers[i+1][1] if i+1 < len(headers) else size
+        if keyword not in sections:
+            count = SECTION_COUNTS.get(keyword)
+            sections[keyword] = Section(min(start,size), end, counts.get(count, 0) if count else None)
+    return SectionIndex(name, counts, box, sections)
+
+def topology_fingerprint(fopen, index):
+    """ SHA-256 of the header counts and of all sections but FINGERPRINT_EXCLUDED, everything the bonded part of the output depends on """
+    sha = hashlib.sha256(repr(sorted(index.counts.items())).encode())
+    # File order, so that a stream is read forward
+    for keyword, section in sorted(index.sections.items(), key=lambda item: item[1].start):
+        if keyword in FINGERPRINT_EXCLUDED:
+            continue
+        sha.update(b'\n'+keyword.encode('utf-8')+b'\n')
+        fopen.seek(section.start)
+        remaining = section.end-section.start
+        while remaining > 0:
+            block = fopen.read(min(INDEX_BLOCK, remaining))
+            if block == b'':
+                break
+            sha.update(block)
+            remaining -= len(block)
+    return sha.hexdigest()
+
+def _seek_rows(fopen, index, keyword):
+    """ Position fopen at the first row of a section, past the blank line after its header, and return its Section """
+    if keyword not in index.sections:
+        raise RuntimeError("Section '"+keyword+"' not found in "+index.name)
+    section = index.sections[keyword]
+    fopen.seek(section.start)
+    while True:
+        pos = fopen.tell()
         curr_line = fopen.readline()
-        curr_line_split = curr_line.split()
-        # Masses d
-        if (len(curr_line_split) > 0): 
-            if (curr_line_split[0] == 'Atoms'): 
-                fopen.readline()
-                atom = np.zeros((num_atom,6))
-                for i in range(num_atom):
-                    curr_line = fopen.readline()
-                    curr_line_split = curr_line.split()
-                    atom[i,0] = np.double(curr_line_split[1]) # molecule-tag 
-                    atom[i,1] = np.double(curr_line_split[2]) # type 
-                    atom[i,2] = np.double(curr_line_split[3]) # charge
-                    atom[i,3] = np.double(curr_line_split[4]) # x_position
-                    atom[i,4] = np.double(curr_line_split[5]) # y_position
-                    atom[i,5] = np.double(curr_line_split[6]) # z_position
-                # End of atoms
-                eof_atom = 1  
-
-    if num_bond_type == 0:                   
-        bond_coeff = []
-        bond_label = []
-        bond = []
-    else:
-        # Read bond coefficients 
-        eof_bond_coeff = 0 # End of bond_coeffs 
-        while (eof_bond_coeff == 0): 
-            curr_line = fopen.readline()
-            curr_line_split = curr_line.split()
-            # Masses d
-            if (len(curr_line_split) > 0): 
-                if (curr_line_split[0] == 'Bond'): 
-                    fopen.readline()
-                    bond_coeff = np.zeros((num_bond_type,2))
-                    bond_label = []
-                    for i in range(num_bond_type):
-                        curr_line = fopen.readline()
-                        curr_line_split = curr_line.split()
-                        bond_coeff[i,0] = np.double(curr_line_split[1]) # Bond coefficient 
-                        bond_coeff[i,1] = np.double(curr_line_split[2]) # Eq_distance 
-                        bond_label.append([curr_line_split[4],curr_line_split[5]])  # Label connection for bond type
-                    # End of bond_coeffs 
-                    eof_bond_coeff = 1  
-        
-        
-        # Read bonds 
-        eof_bond = 0 # End of bond_coeffs 
-        while (eof_bond == 0): 
-            curr_line = fopen.readline()
-            curr_line_split = curr_line.split()
-            if (len(curr_line_split) > 0): 
-                if (curr_line_split[0] == 'Bonds'): 
-                    fopen.readline()
-                    bond = np.zeros((num_bond,3))
-                    for i in range(num_bond):
-                        curr_line = fopen.readline()
-                        curr_line_split = curr_line.split()
-                        bond[i,0] = np.double(curr_line_split[1]) # Bond type
-                        bond[i,1] = np.double(curr_line_split[2]) # ID_1
-                        bond[i,2] = np.double(curr_line_split[3]) # ID_2
-                    # End of bond_coeffs 
-                    eof_bond = 1  
-                
-    if num_angle_type == 0:
-        angle_coeff=[]
-        angle_label=[]
-        angle=[]
-    else:
-        # Read angle coefficients 
-        eof_angle_coeff = 0 # End of angle coeffs 
-        while (eof_angle_coeff == 0): 
-            curr_line = fopen.readline()
-            curr_line_split = curr_line.split()
-            if (len(curr_line_split) > 0): 
-                if (curr_line_split[0] == 'Angle'): 
-                    fopen.readline()
-                    angle_coeff = np.zeros((num_angle_type,4))
-                    angle_label = []
-                    for i in range(num_angle_type):
-                        curr_line = fopen.readline()
-                        curr_line_split = curr_line.split()
-                        angle_coeff[i,0] = np.double(curr_line_split[1]) # Angle coefficient
-                        angle_coeff[i,1] = np.double(curr_line_split[2]) # Eq_angle 
-                        angle_coeff[i,2] = np.double(curr_line_split[3]) # CHARMM_coeff1
-                        angle_coeff[i,3] = np.double(curr_line_split[4]) # CHARMM_coeff2
-                        angle_label.append([curr_line_split[6],curr_line_split[7],curr_line_split[8]]) # Label connection for angle type
-                    # End of angle coeffs 
-                    eof_angle_coeff = 1  
-        
-        # Read angle 
-        eof_angle = 0 # End of angle
-        while (eof_angle == 0): 
-            curr_line = fopen.readline()
-            curr_line_split = curr_line.split()
-            if (len(curr_line_split) > 0): 
-                if (curr_line_split[0] == 'Angles'): 
-                    fopen.readline()
-                    angle = np.zeros((num_angle,4))
-                    for i in range(num_angle):
-                        curr_line = fopen.readline()
-                        curr_line_split = curr_line.split()
-                        angle[i,0] = np.double(curr_line_split[1]) # Angle type
-                        angle[i,1] = np.double(curr_line_split[2]) # ID_1 
-                        angle[i,2] = np.double(curr_line_split[3]) # ID_2
-                        angle[i,3] = np.double(curr_line_split[4]) # ID_3
-                    # End of angle
-                    eof_angle = 1 
-                
-    if num_dihedral_type == 0:
-        dihedral_coeff=[]
-        dihedral_label=[]
-        dihedral=[]
+        if curr_line.strip() or curr_line == b'':
+            break
+    fopen.seek(pos)
+    return section
+
+##################################################################
+# READ SECTIONS
+##################################################################
+def _read_block(lines, num_rows, usecols, dtype):
+    """ Parse the next num_rows numeric rows of an iterator over the lines of a section at once """
+    if num_rows == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.loadtxt(itertools.islice(lines, num_rows), dtype=dtype, usecols=usecols, comments='#', ndmin=1)
+
+def _missing_rows(keyword, name, num_read, num_rows):
+    """ Error for a section holding fewer rows than its header count """
+    return RuntimeError("Section '"+keyword+"' of "+name+" has "+str(num_read)+" rows, expected "+str(num_rows))
+
+def _read_rows(lines, num_rows, keyword, name):
+    """ Parse the next num_rows rows of the Atoms or a bonded section, fewer rows are an error """
+    rows = _read_block(lines, num_rows, *SECTION_COLUMNS[keyword])
+    if len(rows) < num_rows:
+        raise _missing_rows(keyword, name, len(rows), num_rows)
+    return rows
+
+def _read_chunks(lines, num_rows, chunk_size, keyword, name):
+    """ Yield the next num_rows rows of the Atoms or a bonded section in arrays of at most chunk_size rows, fewer rows are an error """
+    usecols, dtype = SECTION_COLUMNS[keyword]
+    for start in range(0, num_rows, chunk_size):
+        rows = _read_block(lines, min(chunk_size,num_rows-start), usecols, dtype)
+        if len(rows) < min(chunk_size,num_rows-start):
+            raise _missing_rows(keyword, name, start+len(rows), num_rows)
+        yield rows
+
+def _lines(fopen):
+    """ Iterator over the lines of fopen from its position, readline rather than line iteration, which an mmap does not support """
+    return iter(fopen.readline, b'')
+
+def _line_pieces(fopen, start, end, piece_size):
+    """ Split the byte range [start, end) of fopen into ranges of about piece_size ending at line boundaries """
+    pieces = []
+    while start < end:
+        stop = start+piece_size
+        if stop < end:
+            # Extend to the end of the line the nominal boundary falls in
+            fopen.seek(stop)
+            fopen.readline()
+            stop = min(fopen.tell(), end)
+        else:
+            stop = end
+        pieces.append((start, stop))
+        start = stop
+    return pieces
+
+def _parse_piece(data, usecols, dtype):
+    """ Parse all rows in a bytes object holding whole lines """
+    with warnings.catch_warnings():
+        # A piece holding only blank lines is not an error
+        warnings.simplefilter('ignore', UserWarning)
+        return np.loadtxt(io.BytesIO(data), dtype=dtype, usecols=usecols, comments='#', ndmin=1)
+
+def _parse_file_piece(filename, start, stop, usecols, dtype):
+    """ Parse all rows in bytes [start, stop) of a file, run in a worker process """
+    with open(filename, "rb") as fopen:
+        fopen.seek(start)
+        return _parse_piece(fopen.read(stop-start), usecols, dtype)
+
+def _drop_pages(buf, start, stop):
+    """ Keep an already parsed byte range of a memory-mapped file out of the resident set """
+    if isinstance(buf, mmap.mmap) and hasattr(buf, 'madvise'):
+        page_start = start-start%mmap.PAGESIZE
+        buf.madvise(mmap.MADV_DONTNEED, page_start, stop-page_start)
+
+def _in_order(pool, jobs):
+    """ Yield the results of (function, args) jobs in order, running up to 2 jobs per worker ahead in a ParsePool """
+    futures = collections.deque()
+    for function, args in jobs:
+        futures.append(pool.executor.submit(function, *args))
+        if len(futures) >= 2*pool.workers:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+def _piece_jobs(fopen, ranges, usecols, dtype, pool):
+    """ (function, args) parsing each byte range in a ParsePool """
+    for start, stop in ranges:
+        if pool.source is not None:
+            # Worker processes read their piece from the file themselves
+            yield _parse_file_piece, (pool.source, start, stop, usecols, dtype)
+        else:
+            fopen.seek(start)
+            yield _parse_piece, (fopen.read(stop-start), usecols, dtype)
+            _drop_pages(fopen, start, stop)
+
+def _parsed_pieces(fopen, ranges, usecols, dtype, pool):
+    """ Yield the parsed rows of each byte range in order, parsing up to 2 pieces per worker ahead in the pool """
+    if pool is None:
+        for start, stop in ranges:
+            fopen.seek(start)
+            data = fopen.read(stop-start)
+            _drop_pages(fopen, start, stop)
+            yield _parse_piece(data, usecols, dtype)
+        return
+    yield from _in_order(pool, _piece_jobs(fopen, ranges, usecols, dtype, pool))
+
+def _assemble_rows(pieces, num_rows, dtype, keyword, name):
+    """ Concatenate the parsed pieces of a section, extra rows are dropped and missing ones are an error """
+    rows = np.zeros(num_rows, dtype=dtype)
+    num_read = 0
+    for piece in pieces:
+        piece = piece[:num_rows-num_read]
+        rows[num_read:num_read+len(piece)] = piece
+        num_read += len(piece)
+    if num_read < num_rows:
+        raise _missing_rows(keyword, name, num_read, num_rows)
+    return rows
+
+def _read_section_pieces(fopen, index, keyword, pool=None):
+    """ Parse a section in line-aligned byte ranges (in a ParsePool if given) and assemble the rows in file order """
+    section = _seek_rows(fopen, index, keyword)
+    usecols, dtype = SECTION_COLUMNS[keyword]
+    start = fopen.tell()
+    piece_size = MMAP_PIECE
+    if pool is not None:
+        # Enough pieces to keep every worker busy
+        piece_size = max(MIN_PARALLEL_PIECE, min(piece_size, (section.end-start)//(PIECES_PER_WORKER*pool.workers)))
+    pieces = _parsed_pieces(fopen, _line_pieces(fopen, start, section.end, piece_size), usecols, dtype, pool)
+    return _assemble_rows(pieces, section.num_rows, dtype, keyword, index.name)
+
+def _parse_coeff_rows(lines, num_rows, num_coeff, num_label, keyword, name):
+    """ Parse the rows of a coefficient section: id, coefficients, '#', labels (lists of num_label names) """
+    coeff = np.zeros((num_rows,num_coeff))
+    label = []
+    for i in range(num_rows):
+        curr_line_split = _decode(next(lines, b'')).split()
+        coeff[i,:] = [np.double(x) for x in curr_line_split[1:1+num_coeff]]
+        label.append(curr_line_split[2+num_coeff:2+num_coeff+num_label])
+        if len(label[-1]) != num_label:
+            raise RuntimeError("Row "+str(i+1)+" of section '"+keyword+"' of "+name+" does not have "+str(num_label)+" type label names")
+    return coeff, label
+
+def _read_coeff_section(fopen, index, keyword):
+    """ Parse the rows of a coefficient section of an indexed file """
+    section = _seek_rows(fopen, index, keyword)
+    return _parse_coeff_rows(_lines(fopen), section.num_rows, *COEFF_COLUMNS[keyword], keyword, index.name)
+
+def read_LAMMPS_section(fopen, index, keyword, pool=None):
+    """ Parse all rows of the Atoms or a bonded section into a structured array, in parallel if given a ParsePool """
+    if pool is not None or isinstance(fopen, mmap.mmap):
+        return _read_section_pieces(fopen, index, keyword, pool)
+    section = _seek_rows(fopen, index, keyword)
+    return _read_rows(_lines(fopen), section.num_rows, keyword, index.name)
+
+def iter_LAMMPS_section(fopen, index, keyword, chunk_size):
+    """ Yield the rows of the Atoms or a bonded section as structured arrays of at most chunk_size rows """
+    section = _seek_rows(fopen, index, keyword)
+    for rows in _read_chunks(_lines(fopen), section.num_rows, chunk_size, keyword, index.name):
+        # Resume from here even if fopen is moved in between
+        pos = fopen.tell()
+        yield rows
+        fopen.seek(pos)
+
+def _types_topology(counts, box, read_coeff, pair_coeff):
+    """ Topology without rows from the header and read_coeff(keyword) -> coefficients, labels of a coefficient section """
+    mass, labels = read_coeff('Masses')
+    labels = tuple(label[0] for label in labels)
+    # Atom type names get the codes 0, 1, ... in the order of their types
+    registry = LabelRegistry(labels)
+    if pair_coeff:
+        pair_coeff, _ = read_coeff('Pair Coeffs')
     else:
-        # Read dihedral coefficients  
-        eof_dihedral_coeff = 0 # End of dihedral coefficient flag
-        while (eof_dihedral_coeff == 0): 
+        pair_coeff = None
+    interactions = {}
+    for kind, (coeff_section, num_coeff, _, num_atoms) in INTERACTION_SECTIONS.items():
+        if counts.get(kind+' types', 0) == 0:
+            coeff, label = np.zeros((0,num_coeff)), []
+        else:
+            coeff, label = read_coeff(coeff_section)
+        interactions[kind] = Interactions(counts.get(kind+'s', 0), coeff, registry.encode(label, num_atoms))
+    return Topology(counts.get('atoms', 0), box, mass[:,0], labels, pair_coeff, None, registry, **interactions)
+
+def _types_sections(counts, pair_coeff):
+    """ Coefficient sections a Topology without rows is read from """
+    sections = ['Masses']+(['Pair Coeffs'] if pair_coeff else [])
+    return sections+[coeff_section for kind, (coeff_section, _, _, _) in INTERACTION_SECTIONS.items() if counts.get(kind+' types', 0) > 0]
+
+def read_LAMMPS_types(fopen, index, pair_coeff=True):
+    """ Read masses, atom type labels, pair coefficients and bonded coefficients into a Topology without rows """
+    return _types_topology(index.counts, index.box, lambda keyword: _read_coeff_section(fopen, index, keyword), pair_coeff)
+
+##################################################################
+# FRONT-TO-BACK READ OF STREAMS
+##################################################################
+def _walk_headers(fopen):
+    """ Yield keyword, iterator over the lines of every section after the current position, reading forward only """
+    curr_line = fopen.readline()
+    while curr_line:
+        if not curr_line[:1].isalpha():
+            # Rows nobody read, or blank lines
             curr_line = fopen.readline()
-            curr_line_split = curr_line.split()
-            if (len(curr_line_split) > 0): 
-                if (curr_line_split[0] == 'Dihedral'): 
-                    fopen.readline()
-                    dihedral_coeff = np.zeros((num_dihedral_type,4))
-                    dihedral_label = []
-                    for i in range(num_dihedral_type):
-                        curr_line = fopen.readline()
-                        curr_line_split = curr_line.split()
-                        dihedral_coeff[i,0] = np.double(curr_line_split[1]) # Coeff1
-                        dihedral_coeff[i,1] = np.double(curr_line_split[2]) # Coeff2 
-                        dihedral_coeff[i,2] = np.double(curr_line_split[3]) # Coeff3
-                        dihedral_coeff[i,3] = np.double(curr_line_split[4]) # Coeff4
-                        dihedral_label.append([curr_line_split[6],curr_line_split[7],curr_line_split[8],curr_line_split[9]]) # Label connection for angle type
-                    # End of dihedral coefficients flag 
-                    eof_dihedral_coeff = 1  
-        
-        # Read dihedral
-        eof_dihedral = 0 # End of dihedral flag
-        while (eof_dihedral == 0): 
+            continue
+        keyword = _decode(curr_line.split(b'#')[0].strip())
+        curr_line = fopen.readline()
+        while curr_line and not curr_line.strip():
             curr_line = fopen.readline()
-            curr_line_split = curr_line.split()
-            if (len(curr_line_split) > 0): 
-                if (curr_line_split[0] == 'Dihedrals'): 
-                    fopen.readline()
-                    dihedral = np.zeros((num_dihedral,5))
-                    for i in range(num_dihedral):
-                        curr_line = fopen.readline()
-                        curr_line_split = curr_line.split()
-                        dihedral[i,0] = np.double(curr_line_split[1]) # Dihedral coefficient
-                        dihedral[i,1] = np.double(curr_line_split[2]) # ID_1
-                        dihedral[i,2] = np.double(curr_line_split[3]) # ID_2
-                        dihedral[i,3] = np.double(curr_line_split[4]) # ID_3
-                        dihedral[i,4] = np.double(curr_line_split[5]) # ID_3
-                    # End of dihedral flag 
-                    eof_dihedral = 1              
-        
-    fopen.close()
-
-    return num_atom,num_bond,num_angle,num_dihedral,num_atom_type,num_bond_type,num_angle_type,num_dihedral_type, \
-           xlo,xhi,ylo,yhi,zlo,zhi,mass,labels,pair_coeff,atom,bond_coeff,bond_label,bond,angle_coeff,angle_label,angle,dihedral_coeff,dihedral_label,dihedral
\ No newline at end of file
+        if not curr_line or curr_line[:1].isalpha():
+            # Empty section, curr_line is the next header
+            yield keyword, iter(())
+            continue
+        yield keyword, itertools.chain((curr_line,), _lines(fopen))
+        curr_line = fopen.readline()
+
+def walk_LAMMPS_sections(fopen, name=None, pair_coeff=True):
+    """
+    Read a binary stream front to back without seeking back, for inputs that cannot seek cheaply (see seeks_cheaply)
+    Yields, in file order, a SectionRows for the Atoms and every bonded section the Topology has rows of, and the
+    Topology without rows as soon as all coefficient sections it needs have been read. Rows of a SectionRows have
+    to be read before the next item is taken, those left unread are skipped
+    """
+    name = str(name if name is not None else getattr(fopen, 'name', fopen))
+    counts, box = _read_header(fopen, name)
+    row_sections = ['Atoms']+[section for kind, (_, _, section, _) in INTERACTION_SECTIONS.items() if counts.get(kind+' types', 0) > 0]
+    needed = _types_sections(counts, pair_coeff)
+    tables = {}
+    seen = set()
+    for keyword, lines in _walk_headers(fopen):
+        # Only the first section of a keyword counts, as for index_LAMMPS_sections
+        if keyword in seen:
+            continue
+        seen.add(keyword)
+        if keyword in row_sections:
+            yield SectionRows(keyword, counts.get(SECTION_COUNTS[keyword], 0), lines)
+        elif keyword in needed:
+            tables[keyword] = _parse_coeff_rows(lines, counts.get(SECTION_COUNTS[keyword], 0), *COEFF_COLUMNS[keyword], keyword, name)
+            if len(tables) == len(needed):
+                yield _types_topology(counts, box, tables.__getitem__, pair_coeff)
+    for keyword in needed+row_sections:
+        if keyword not in seen:
+            raise RuntimeError("Section '"+keyword+"' not found in "+name)
+
+def read_section_rows(section, name, pool=None):
+    """ Parse all rows of a SectionRows into a structured array, in pieces of whole lines in a ParsePool if given """
+    if pool is None:
+        return _read_rows(section.lines, section.num_rows, section.keyword, name)
+    usecols, dtype = SECTION_COLUMNS[section.keyword]
+    # Enough pieces to keep every worker busy
+    piece_rows = max(MIN_PARALLEL_ROWS, min(STREAM_PIECE_ROWS, -(-section.num_rows//(PIECES_PER_WORKER*pool.workers))))
+    jobs = ((_parse_piece, (b''.join(itertools.islice(section.lines, min(piece_rows,section.num_rows-start))), usecols, dtype))
+            for start in range(0, section.num_rows, piece_rows))
+    return _assemble_rows(_in_order(pool, jobs), section.num_rows, dtype, section.keyword, name)
+
+def iter_section_rows(section, name, chunk_size):
+    """ Yield the rows of a SectionRows as structured arrays of at most chunk_size rows """
+    return _read_chunks(section.lines, section.num_rows, chunk_size, section.keyword, name)
+
+##################################################################
+# READ LAMMPS BONDED DATA FILE
+##################################################################
+def read_LAMMPS_bonded(filename, pair_coeff=True, use_mmap=False, workers=1):
+    """
+    Read LAMMPS topology file (path, bytes or file object) into a Topology
+    Args:
+        pair_coeff: False skips Pair Coeffs
+        use_mmap: memory-map the file and parse sections from the mapping instead of line by line
+        workers: parse the Atoms and bonded sections in pieces on this many cores, None uses all available CPUs
+    """
+    with open_LAMMPS_input(filename, use_mmap) as fopen, open_parse_pool(filename, workers) as pool:
+        if seeks_cheaply(fopen):
+            index = index_LAMMPS_sections(fopen, source_name(filename))
+            topology = read_LAMMPS_types(fopen, index, pair_coeff)
+            rows = {keyword: read_LAMMPS_section(fopen, index, keyword, pool) for keyword in _row_sections(topology)}
+        else:
+            # Parse every section when the single pass over the stream reaches it
+            rows = {}
+            for item in walk_LAMMPS_sections(fopen, source_name(filename), pair_coeff):
+                if isinstance(item, Topology):
+                    topology = item
+                else:
+                    rows[item.keyword] = read_section_rows(item, source_name(filename), pool)
+    topology.atom = rows['Atoms']
+    for kind, interactions in topology.interactions():
+        if interactions.num_type == 0:
+            interactions.rows = np.zeros(0, dtype=interaction_dtype(INTERACTION_SECTIONS[kind][3]))
+        else:
+            interactions.rows = rows[INTERACTION_SECTIONS[kind][2]]
+    return topology
+
+def _row_sections(topology):
+    """ Atoms and the bonded sections a Topology has rows of """
+    return ['Atoms']+[INTERACTION_SECTIONS[kind][2] for kind, interactions in topology.interactions() if interactions.num_type > 0]
@@ -0,0 +1,161 @@
+"""
+Created on Sun Oct 18 2026
+
+In-memory topology of a LAMMPS bonded data file
+
+Atoms and interaction rows are kept as structured arrays with int32
+IDs/types; only charges and coordinates are float64. Bonded type labels
+are rows of int32 codes of atom type names in a LabelRegistry, rendered
+to strings only when written.
+
+@author: Ilia Nikiforov
+"""
+import numpy as np
+
+# One row of the Atoms section (the atom ID is the row index + 1)
+ATOM_DTYPE = np.dtype([('mol',np.int32),('type',np.int32),('q',np.float64),('x',np.float64),('y',np.float64),('z',np.float64)])
+
+# Bonded interaction kinds: Coeffs section, coefficients per type, data section, atoms per interaction
+INTERACTION_SECTIONS = {
+    'bond': ('Bond Coeffs', 2, 'Bonds', 2),             # Bond coefficient, Eq_distance
+    'angle': ('Angle Coeffs', 4, 'Angles', 3),          # Angle coefficient, Eq_angle, CHARMM_coeff1, CHARMM_coeff2
+    'dihedral': ('Dihedral Coeffs', 4, 'Dihedrals', 4), # Coeff1, Coeff2, Coeff3, Coeff4
+    'improper': ('Improper Coeffs', 2, 'Impropers', 4), # Improper coefficient, Eq_angle
+}
+INTERACTION_KINDS = tuple(INTERACTION_SECTIONS)
+
+def interaction_dtype(num_atoms):
+    """ One row of a bonded section: type and the IDs of num_atoms atoms (the interaction ID is the row index + 1) """
+    return np.dtype([('type',np.int32),('atom',np.int32,(num_atoms,))])
+
+##################################################################
+# ATOM TYPE NAMES OF BONDED TYPE LABELS
+##################################################################
+class LabelRegistry:
+    """
+    Atom type names interned to small integer codes, in order of registration
+    Attributes:
+        names: list of names, indexed by code
+        codes: dict name -> code
+    """
+    __slots__ = ('names','codes')
+
+    def __init__(self,names=()):
+        self.names = []
+        self.codes = {}
+        for name in names:
+            self.code(name)
+
+    def code(self,name):
+        """ Code of name, registering it if new """
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def encode(self,labels,num_atoms):
+        """ int32 array (len(labels), num_atoms) of the codes of a sequence of labels (sequences of names) """
+        code = self.code
+        return np.array([[code(name) for name in label] for label in labels], dtype=np.int32).reshape(-1,num_atoms)
+
+    def render(self,label,sep='-'):
+        """ Names of the rows of an integer-coded label array, joined by sep """
+        names = self.names
+        return [sep.join([names[code] for code in row]) for row in label.tolist()]
+
+##################################################################
+# ONE BONDED INTERACTION KIND
+##################################################################
+class Interactions:
+    """
+    Types and rows of one bonded interaction kind
+    Attributes:
+        count: number of interactions given in the file header
+        coeff: float64 array (num_type, num_coeff)
+        label: int32 array (num_type, atoms per interaction) of atom type name codes, one row per type
+        rows: structured array of interaction_dtype, None if the rows were not read
+    """
+    __slots__ = ('count','coeff','label','rows')
+
+    def __init__(self,count,coeff,label,rows=None):
+        self.count = count
+        self.coeff = coeff
+        self.label = label
+        self.rows = rows
+
+    @property
+    def num_type(self):
+        return len(self.label)
+
+##################################################################
+# TOPOLOGY
+##################################################################
+class Topology:
+    """
+    Content of a LAMMPS bonded data file
+    Attributes:
+        num_atom: number of atoms given in the file header
+        box: float64 array [[xlo,xhi],[ylo,yhi],[zlo,zhi]]
+        mass: float64 array, one per atom type
+        labels: tuple of atom type labels
+        pair_coeff: float64 array (num_atom_type, 2) of epsilon, sigma
+        atom: structured array of ATOM_DTYPE, None if the Atoms section was not read
+        registry: LabelRegistry of the names in bonded type labels, starting with the atom type labels
+        bond, angle, dihedral, improper: Interactions
+    """
+    __slots__ = ('num_atom','box','mass','labels','pair_coeff','atom','registry') + INTERACTION_KINDS
+
+    def __init__(self,num_atom,box,mass,labels,pair_coeff,atom,registry=None,**interactions):
+        self.num_atom = num_atom
+        self.box = box
+        self.mass = mass
+        self.labels = labels
+        self.pair_coeff = pair_coeff
+        self.atom = atom
+        self.registry = registry if registry is not None else LabelRegistry(labels)
+        for kind in INTERACTION_KINDS:
+            setattr(self, kind, interactions[kind])
+
+    @property
+    def num_atom_type(self):
+        return len(self.labels)
+
+    def interactions(self):
+        """ (kind, Interactions) pairs in file order """
+        return [(kind, getattr(self, kind)) for kind in INTERACTION_KINDS]
+
+##################################################################
+# BINARY TOPOLOGY FILE
+##################################################################
+# Layout version of the .npz files written by save_topology
+TOPOLOGY_FORMAT = 2
+
+def save_topology(filename, topology):
+    """ Save a Topology with its rows to an uncompressed .npz file, which load_topology reads back without parsing text """
+    if topology.atom is None:
+        raise RuntimeError("Topology has no atom rows to save to "+str(filename))
+    arrays = {'format': np.array(TOPOLOGY_FORMAT), 'num_atom': np.array(topology.num_atom), 'box': topology.box,
+              'mass': topology.mass, 'labels': np.array(topology.labels, dtype=str), 'atom': topology.atom,
+              'label_names': np.array(topology.registry.names, dtype=str)}
+    if topology.pair_coeff is not None:
+        arrays['pair_coeff'] = topology.pair_coeff
+    for kind, interactions in topology.interactions():
+        num_atoms = INTERACTION_SECTIONS[kind][3]
+        arrays[kind+'_count'] = np.array(interactions.count)
+        arrays[kind+'_coeff'] = interactions.coeff
+        arrays[kind+'_label'] = interactions.label
+        arrays[kind+'_rows'] = interactions.rows if interactions.rows is not None else np.zeros(0, dtype=interaction_dtype(num_atoms))
+    np.savez(filename, **arrays)
+
+def load_topology(filename):
+    """ Load a Topology saved by save_topology """
+    with np.load(filename, allow_pickle=False) as npz:
+        if 'format' not in npz or int(npz['format']) != TOPOLOGY_FORMAT:
+            raise RuntimeError(str(filename)+" is not a topology file of format "+str(TOPOLOGY_FORMAT))
+        interactions = {}
+        for kind in INTERACTION_KINDS:
+            interactions[kind] = Interactions(int(npz[kind+'_count']), npz[kind+'_coeff'], npz[kind+'_label'], npz[kind+'_rows'])
+        return Topology(int(npz['num_atom']), npz['box'], npz['mass'], tuple(npz['labels'].tolist()),
+                        npz['pair_coeff'] if 'pair_coeff' in npz else None, npz['atom'],
+                        LabelRegistry(npz['label_names'].tolist()), **interactions)
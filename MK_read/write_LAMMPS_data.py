@@ -1,4 +1,12 @@
+import collections
+import concurrent.futures
+import contextlib
+import io
 import os
+import numpy as np
+from .topology import ATOM_DTYPE, INTERACTION_SECTIONS
+from .compression import compression_suffix, open_compressed
+from .read_LAMMPS_data import available_cpus
 """
 Creatd on Sun Aug 7 2021
 
@@ -12,59 +20,163 @@ Output:
     
 @author: Moon-ki Choi, ilia Nikiforov
 """
+
+# Row formats of the sections following the type labels
+# NOTE Current version of the code does not write image flag because imag flags for target system MoS2 are just 0 0 0
+ATOM_FORMAT = '  %d %d %d %17.15e %17.15e %17.15e %17.15e   0   0   0\n'
+BOND_FORMAT = '  %d  %d %d %d\n'
+ANGLE_FORMAT = '  %d %d %d %d %d\n'
+DIHEDRAL_FORMAT = '  %d  %d  %d  %d  %d  %d\n'
+IMPROPER_FORMAT = '  %d  %d  %d  %d  %d  %d\n'
+ROW_FORMAT = {'bond': BOND_FORMAT, 'angle': ANGLE_FORMAT, 'dihedral': DIHEDRAL_FORMAT, 'improper': IMPROPER_FORMAT}
+
+# Kinds whose header counts are only written if the file has types of them
+OPTIONAL_KINDS = ('improper',)
+
+# Rows formatted per block and handed to a single fout.write
+WRITE_CHUNK = 100000
+
+# Smallest number of rows formatted in a process pool, below it starting the pool costs more than it saves
+PARALLEL_MIN_ROWS = 4*WRITE_CHUNK
+
+# Bytes buffered in front of the compressor of a compressed output file
+COMPRESSED_WRITE_BUFFER = 2**22
+
 ##################################################################
-# WRITE LAMMPS BONDED DATA FILE AFTER REPLACING WITH LABELS (version 2)
+# OPEN OUTPUT FILE
 ##################################################################
-def write_LAMMPS_bonded_label_v2(filename,num_atom,num_bond,num_angle,num_dihedral,num_atom_type,num_bond_type,num_angle_type,num_dihedral_type, \
-       xlo,xhi,ylo,yhi,zlo,zhi,labels,atom,bond_label,bond,angle_label,angle,dihedral_label,dihedral):
+@contextlib.contextmanager
+def open_LAMMPS_output(filename):
+    """
+    Yield a text stream writing to filename, compressed if it ends in .gz/.xz/.zst, refusing to overwrite an existing file
+    A text or binary file object is written to at its current position and left open
+    """
+    if not isinstance(filename, (str, os.PathLike)):
+        if isinstance(filename, io.TextIOBase):
+            yield filename
+            return
+        fout = io.TextIOWrapper(filename)
+        try:
+            yield fout
+        finally:
+            fout.flush()
+            fout.detach()
+        return
     if os.path.exists(filename):
-        raise RuntimeError ("Refusing to overwrite "+filename)
+        raise RuntimeError ("Refusing to overwrite "+str(filename))
+    if compression_suffix(filename) is not None:
+        with io.TextIOWrapper(io.BufferedWriter(open_compressed(filename,'wb'),COMPRESSED_WRITE_BUFFER)) as fout:
+            yield fout
+        return
     with open(filename,'w') as fout:
-        fout.write('LAMMPS data with labels (Moon-ki Choi/Ilia Nikiforov) \n\n')
-        # Box information 
-        fout.write('   {:d} atoms\n'.format(num_atom))
-        fout.write('   {:d} bonds\n'.format(num_bond))
-        fout.write('   {:d} angles\n'.format(num_angle))
-        fout.write('   {:d} dihedrals\n\n'.format(num_dihedral))
-        fout.write('   {:d} atom types\n'.format(num_atom_type))
-        fout.write('   {:d} bond types\n'.format(num_bond_type))
-        fout.write('   {:d} angle types\n'.format(num_angle_type))
-        fout.write('   {:d} dihedral types\n\n'.format(num_dihedral_type))
-        fout.write(' {:17.15e}    {:17.15e} xlo xhi\n'.format(xlo,xhi))
-        fout.write(' {:17.15e}    {:17.15e} ylo yhi\n'.format(ylo,yhi))
-        fout.write(' {:17.15e}    {:17.15e} zlo zhi\n\n'.format(zlo,zhi))
-        fout.write('Atom Type Labels\n\n')
-        for i in range(num_atom_type):
-            fout.write('  {:d} {:s}\n'.format(i+1,labels[i]))
-        if num_bond_type > 0:
-            fout.write('\nBond Type Labels\n\n')
-            for i in range(num_bond_type):
-                fout.write('  {:d} {:s}-{:s}\n'.format(i+1,bond_label[i][0],bond_label[i][1]))
-        if num_angle_type > 0:
-            fout.write('\nAngle Type Labels\n\n')
-            for i in range(num_angle_type):
-                fout.write('  {:d} {:s}-{:s}-{:s}\n'.format(i+1,angle_label[i][0],angle_label[i][1],angle_label[i][2]))
-        if num_dihedral_type > 0:
-            fout.write('\nDihedral Type Labels\n\n')
-            for i in range(num_dihedral_type):
-                fout.write('  {:d} {:s}-{:s}-{:s}-{:s}\n'.format(i+1,dihedral_label[i][0],dihedral_label[i][1],dihedral_label[i][2],dihedral_label[i][3]))
-        # NOTE: Current version of the code does not write improper type labels because target system MoS2 does not have improper information
-        #fout.write('\nImproper Type Labels\n\n')
-        
+        yield fout
+
+##################################################################
+# WRITE HEADER AND TYPE LABELS
+##################################################################
+def write_LAMMPS_head_label(fout,topology):
+    fout.write('LAMMPS data with labels (Moon-ki Choi/Ilia Nikiforov) \n\n')
+    kinds = [(kind, interactions) for kind, interactions in topology.interactions()
+             if kind not in OPTIONAL_KINDS or interactions.num_type > 0]
+    # Box information 
+    fout.write('   {:d} atoms\n'.format(topology.num_atom))
+    for kind, interactions in kinds:
+        fout.write('   {:d} {:s}s\n'.format(interactions.count,kind))
+    fout.write('\n')
+    fout.write('   {:d} atom types\n'.format(topology.num_atom_type))
+    for kind, interactions in kinds:
+        fout.write('   {:d} {:s} types\n'.format(interactions.num_type,kind))
+    fout.write('\n')
+    for axis, (lo, hi) in zip('xyz', topology.box):
+        fout.write(' {:17.15e}    {:17.15e} {:s}lo {:s}hi\n'.format(lo,hi,axis,axis))
+    fout.write('\nAtom Type Labels\n\n')
+    for i, label in enumerate(topology.labels):
+        fout.write('  {:d} {:s}\n'.format(i+1,label))
+    for kind, interactions in topology.interactions():
+        if interactions.num_type > 0:
+            fout.write('\n{:s} Type Labels\n\n'.format(kind.capitalize()))
+            for i, label in enumerate(topology.registry.render(interactions.label)):
+                fout.write('  {:d} {:s}\n'.format(i+1,label))
+
+##################################################################
+# WRITE ROWS OF THE ATOMS AND BONDED SECTIONS
+##################################################################
+def format_LAMMPS_atom_rows(atom,first_id=1):
+    """ Text of atom rows numbered from first_id """
+    num_rows = len(atom)
+    # Interleave columns row-major: ID, molecule-tag, type, charge, x, y, z
+    values = [None]*(7*num_rows)
+    values[0::7] = range(first_id,first_id+num_rows)
+    for j, field in enumerate(ATOM_DTYPE.names):
+        values[j+1::7] = atom[field].tolist()
+    return (ATOM_FORMAT*num_rows) % tuple(values)
+
+def format_LAMMPS_interaction_rows(row_format,interaction,first_id=1):
+    """ Text of bond/angle/dihedral/improper rows (type, atom IDs) numbered from first_id """
+    num_rows = len(interaction)
+    values = np.empty((num_rows,interaction['atom'].shape[1]+2), dtype=np.int64)
+    values[:,0] = np.arange(first_id,first_id+num_rows)
+    values[:,1] = interaction['type']
+    values[:,2:] = interaction['atom']
+    return (row_format*num_rows) % tuple(values.ravel().tolist())
+
+def write_LAMMPS_atom_rows(fout,atom,first_id=1):
+    """ Write atom rows numbered from first_id, formatting WRITE_CHUNK rows per write """
+    for start in range(0,len(atom),WRITE_CHUNK):
+        fout.write(format_LAMMPS_atom_rows(atom[start:start+WRITE_CHUNK],first_id+start))
+
+def write_LAMMPS_interaction_rows(fout,row_format,interaction,first_id=1):
+    """ Write bond/angle/dihedral/improper rows numbered from first_id, formatting WRITE_CHUNK rows per write """
+    for start in range(0,len(interaction),WRITE_CHUNK):
+        fout.write(format_LAMMPS_interaction_rows(row_format,interaction[start:start+WRITE_CHUNK],first_id+start))
+
+def _write_formatted(fout,executor,workers,blocks):
+    """ Format (function, args) blocks in a process pool and write the text in order, up to 2 blocks per worker ahead """
+    futures = collections.deque()
+    for function, args in blocks:
+        futures.append(executor.submit(function,*args))
+        if len(futures) >= 2*workers:
+            fout.write(futures.popleft().result())
+    while futures:
+        fout.write(futures.popleft().result())
+
+def _section_blocks(topology):
+    """ (section, [(function, args) formatting WRITE_CHUNK rows]) of the Atoms and bonded sections in output order """
+    atom = topology.atom
+    sections = [('Atoms', [(format_LAMMPS_atom_rows, (atom[start:start+WRITE_CHUNK],1+start))
+                           for start in range(0,len(atom),WRITE_CHUNK)])]
+    for kind, interactions in topology.interactions():
+        if interactions.num_type > 0:
+            rows = interactions.rows
+            sections.append((INTERACTION_SECTIONS[kind][2],
+                             [(format_LAMMPS_interaction_rows, (ROW_FORMAT[kind],rows[start:start+WRITE_CHUNK],1+start))
+                              for start in range(0,len(rows),WRITE_CHUNK)]))
+    return sections
+
+##################################################################
+# WRITE LAMMPS BONDED DATA FILE AFTER REPLACING WITH LABELS (version 2)
+##################################################################
+def write_LAMMPS_bonded_label_v2(filename,topology,workers=None):
+    """
+    Write a Topology with type labels to filename (path or file object, see open_LAMMPS_output)
+    Args:
+        workers: processes formatting blocks of WRITE_CHUNK rows, None uses all available CPUs. Files of up to
+            PARALLEL_MIN_ROWS rows are formatted in this process
+    """
+    if workers is None:
+        workers = available_cpus()
+    num_rows = len(topology.atom)+sum(len(interactions.rows) for kind, interactions in topology.interactions())
+    with open_LAMMPS_output(filename) as fout:
+        write_LAMMPS_head_label(fout,topology)
+        if workers > 1 and num_rows > PARALLEL_MIN_ROWS:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                for section, blocks in _section_blocks(topology):
+                    fout.write('\n'+section+'\n\n')
+                    _write_formatted(fout,executor,workers,blocks)
+            return
         fout.write('\nAtoms\n\n')
-        # NOTE Current version of the code does not write image flag because imag flags for target system MoS2 are just 0 0 0
-        for i in range(num_atom):
-            fout.write('  {:d} {:d} {:d} {:17.15e} {:17.15e} {:17.15e} {:17.15e}   0   0   0\n'.format(i+1,int(atom[i,0]),int(atom[i,1]),atom[i,2],atom[i,3],atom[i,4],atom[i,5]))    
-        if num_bond_type > 0:
-            fout.write('\nBonds\n\n')    
-            for i in range(num_bond):
-                fout.write('  {:d}  {:d} {:d} {:d}\n'.format(i+1,int(bond[i,0]),int(bond[i,1]),int(bond[i,2])))       
-        if num_angle_type > 0:
-            fout.write('\nAngles\n\n') 
-            for i in range(num_angle):
-                fout.write('  {:d} {:d} {:d} {:d} {:d}\n'.format(i+1,int(angle[i,0]),int(angle[i,1]),int(angle[i,2]),int(angle[i,3])))
-        if num_dihedral_type > 0:                
-            fout.write('\nDihedrals\n\n')         
-            for i in range(num_dihedral):
-                fout.write('  {:d}  {:d}  {:d}  {:d}  {:d}  {:d}\n'.format(i+1,int(dihedral[i,0]),int(dihedral[i,1]),int(dihedral[i,2]),int(dihedral[i,3]),int(dihedral[i,4]))) 
-    fout.close    
\ No newline at end of file
+        write_LAMMPS_atom_rows(fout,topology.atom)
+        for kind, interactions in topology.interactions():
+            if interactions.num_type > 0:
+                fout.write('\n'+INTERACTION_SECTIONS[kind][2]+'\n\n')
+                write_LAMMPS_interaction_rows(fout,ROW_FORMAT[kind],interactions.rows)
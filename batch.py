@@ -0,0 +1,209 @@
+"""
+Convert many CHARMM-GUI .tgz files in parallel
+
+Usage:
+    python -m <package>.batch 'campaign/*.tgz' -o typelabel_dats [-j 8] [--skip-up-to-date] [--stream]
+                              [--cache-dir DIR] [--no-cache] [--incremental] [--compress gz|xz|zst] [--write-workers N]
+
+The cache directory defaults to $LMP_TYPELABEL_CACHE if set.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .convert import convert
+from .cache import ConversionCache, CACHE_MAX_BYTES
+from .MK_read.compression import COMPRESSED_SUFFIXES
+from .MK_read.main import CHUNK_SIZE
+from .MK_read.read_LAMMPS_data import available_cpus
+
+# Archive suffixes stripped to name the output data file
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar')
+
+def _expand(tar_files):
+    """ Expand a glob pattern or a list of paths/patterns into a sorted list of archives """
+    if isinstance(tar_files, (str, os.PathLike)):
+        tar_files = [tar_files]
+    expanded = []
+    for tar_file in tar_files:
+        tar_file = os.fspath(tar_file)
+        matches = sorted(glob.glob(tar_file)) if glob.has_magic(tar_file) else [tar_file]
+        expanded.extend(match for match in matches if match not in expanded)
+    return expanded
+
+def output_path(tar_file,out_dir,compress=None,parents=0):
+    """
+    Data file written for tar_file: out_dir/<archive name without suffix>.data, plus .<compress> if given
+    parents > 0 prepends the names of that many parent directories of the archive, joined by '_'
+    """
+    name = os.path.basename(tar_file)
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    if parents > 0:
+        dirs = [part for part in os.path.dirname(os.path.abspath(tar_file)).split(os.sep) if part]
+        name = '_'.join(dirs[len(dirs)-parents:]+[name])
+    return os.path.join(out_dir, name+'.data'+('.'+compress if compress else ''))
+
+def _output_paths(tar_files,out_dir,compress=None):
+    """
+    Data file of every archive and the archives left without one. Archives sharing an output name (CHARMM-GUI
+    downloads are all called charmm-gui.tgz) get the names of as many parent directories prepended as it takes
+    to tell them apart, those that stay alike (e.g. a.tgz and a.tar.gz next to each other) get an error message
+    """
+    jobs = {tar_file: output_path(tar_file,out_dir,compress) for tar_file in tar_files}
+    max_parents = max([len(os.path.abspath(tar_file).split(os.sep)) for tar_file in tar_files], default=0)
+    parents = 0
+    while True:
+        sharing = {}
+        for tar_file, typelabel_dat in jobs.items():
+            sharing.setdefault(typelabel_dat, []).append(tar_file)
+        clashes = [group for group in sharing.values() if len(group) > 1]
+        if not clashes or parents >= max_parents:
+            break
+        parents += 1
+        for group in clashes:
+            for tar_file in group:
+                jobs[tar_file] = output_path(tar_file,out_dir,compress,parents)
+    errors = {}
+    for group in clashes:
+        for tar_file in group:
+            errors[tar_file] = 'Output path '+jobs.pop(tar_file)+' is shared by '+', '.join(group)
+    return jobs, errors
+
+def _up_to_date(tar_file,typelabel_dat):
+    return os.path.exists(typelabel_dat) and os.path.getmtime(typelabel_dat) >= os.path.getmtime(tar_file)
+
+def _error_message(exc):
+    """ One-line description of an exception """
+    return type(exc).__name__+': '+' '.join(str(exc).split())
+
+def _convert_one(tar_file,typelabel_dat,skip_up_to_date,stream,chunk_size,cache_dir,cache_max_bytes,incremental,write_workers):
+    """ Run one conversion, returning (status, error message, cache hit, bonded sections reused) instead of raising """
+    if skip_up_to_date and _up_to_date(tar_file,typelabel_dat):
+        return 'skipped', None, False, False
+    cache = ConversionCache(cache_dir,cache_max_bytes) if cache_dir is not None else None
+    # Write under a temporary name next to the output first, so that a failed or killed job never leaves
+    # a partial data file behind for --skip-up-to-date to take as current
+    tmp = os.path.join(os.path.dirname(typelabel_dat), '.%d.tmp-' % os.getpid()+os.path.basename(typelabel_dat))
+    try:
+        if os.path.exists(typelabel_dat):
+            raise RuntimeError ("Refusing to overwrite "+typelabel_dat)
+        convert(tar_file,tmp,stream=stream,chunk_size=chunk_size,cache=cache,incremental=incremental and cache is not None,
+                write_workers=write_workers)
+        os.replace(tmp,typelabel_dat)
+    except Exception as exc:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return 'failed', _error_message(exc), False, False
+    return 'converted', None, cache is not None and cache.hits > 0, cache is not None and cache.bonded_hits > 0
+
+def convert_batch(tar_files,out_dir,workers=None,skip_up_to_date=False,stream=False,chunk_size=CHUNK_SIZE,
+                  cache_dir=None,cache_max_bytes=CACHE_MAX_BYTES,incremental=False,compress=None,write_workers=1):
+    """
+    Convert every archive in tar_files to out_dir/<archive name>.data in a process pool. Archives with the same
+    name get the names of their parent directories prepended, out_dir/<parent dir>_<archive name>.data
+    Args:
+        tar_files: list of paths and/or glob patterns of CHARMM-GUI tgz files
+        out_dir: directory to write the data files to, created if it doesn't exist
+        workers: number of worker processes, defaults to the number of available CPUs. 1 converts in this process
+        skip_up_to_date: do not convert archives whose data file is newer than the archive
+        stream, chunk_size: passed on to convert()
+        cache_dir, cache_max_bytes: ConversionCache shared by the workers, None converts every archive
+        incremental: reuse cached bonded sections of archives with the same topology (see convert), needs cache_dir
+        compress: 'gz', 'xz' or 'zst' to write compressed data files <archive name>.data.<compress>
+        write_workers: processes formatting the output of each conversion (see convert). Defaults to 1, since every
+            worker process already converts one archive, more starts workers*write_workers processes
+    Returns:
+        dict with lists 'converted', 'skipped' and 'failed' (of (tar_file, error) pairs),
+        'cache_hits' and 'cache_misses' among the converted archives, 'bonded_hits' and 'bonded_misses'
+        (reused bonded sections or not) among the cache misses of an incremental batch,
+        and 'seconds', 'input_bytes', 'archives_per_second', 'MB_per_second' for the converted archives
+    """
+    if workers is None:
+        workers = available_cpus()
+    tar_files = _expand(tar_files)
+    jobs, clashes = _output_paths(tar_files,out_dir,compress)
+    report = {'converted': [], 'skipped': [], 'failed': [], 'cache_hits': 0, 'cache_misses': 0, 'bonded_hits': 0, 'bonded_misses': 0}
+    job_args = (skip_up_to_date,stream,chunk_size,cache_dir,cache_max_bytes,incremental,write_workers)
+
+    def record(tar_file, status, error, hit, bonded_hit):
+        report[status].append((tar_file, error) if status == 'failed' else tar_file)
+        if status == 'converted' and cache_dir is not None:
+            report['cache_hits' if hit else 'cache_misses'] += 1
+            if incremental and not hit:
+                report['bonded_hits' if bonded_hit else 'bonded_misses'] += 1
+
+    for tar_file, error in clashes.items():
+        record(tar_file, 'failed', error, False, False)
+
+    start = time.perf_counter()
+    if workers == 1:
+        for tar_file, typelabel_dat in jobs.items():
+            record(tar_file, *_convert_one(tar_file,typelabel_dat,*job_args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_convert_one,tar_file,typelabel_dat,*job_args): tar_file
+                       for tar_file, typelabel_dat in jobs.items()}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    # The worker itself died, e.g. killed for running out of memory
+                    result = 'failed', _error_message(exc), False, False
+                record(futures[future], *result)
+    seconds = time.perf_counter()-start
+
+    # Keep the order of the input list
+    order = {tar_file: i for i, tar_file in enumerate(tar_files)}
+    report['converted'].sort(key=order.get)
+    report['skipped'].sort(key=order.get)
+    report['failed'].sort(key=lambda item: order[item[0]])
+    input_bytes = sum(os.path.getsize(tar_file) for tar_file in report['converted'])
+    report['seconds'] = seconds
+    report['input_bytes'] = input_bytes
+    report['archives_per_second'] = len(report['converted'])/seconds if seconds > 0 else 0.0
+    report['MB_per_second'] = input_bytes/2**20/seconds if seconds > 0 else 0.0
+    return report
+
+def format_report(report):
+    """ Human readable summary of a convert_batch report """
+    lines = ['converted %d, skipped %d, failed %d in %.1f s (%.2f archives/s, %.1f MB/s of archives)' % (
+        len(report['converted']), len(report['skipped']), len(report['failed']),
+        report['seconds'], report['archives_per_second'], report['MB_per_second'])]
+    if report['cache_hits'] or report['cache_misses']:
+        lines.append('cache: %d hits, %d misses' % (report['cache_hits'], report['cache_misses']))
+    if report['bonded_hits'] or report['bonded_misses']:
+        lines.append('incremental: %d reused bonded sections, %d converted in full' % (report['bonded_hits'], report['bonded_misses']))
+    for tar_file, error in report['failed']:
+        lines.append('FAILED '+tar_file+': '+error)
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert CHARMM-GUI .tgz files to LAMMPS data files with type labels')
+    parser.add_argument('tar_files', nargs='+', help='archives or glob patterns')
+    parser.add_argument('-o', '--out-dir', required=True, help='directory for the data files')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: number of available CPUs)')
+    parser.add_argument('--skip-up-to-date', action='store_true', help='skip archives whose data file is newer than the archive')
+    parser.add_argument('--stream', action='store_true', help='constant-memory streaming conversion')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows per chunk with --stream')
+    parser.add_argument('--cache-dir', default=os.environ.get('LMP_TYPELABEL_CACHE'), help='conversion cache directory')
+    parser.add_argument('--cache-max-gb', type=float, default=CACHE_MAX_BYTES/2**30, help='size bound of the cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the conversion cache')
+    parser.add_argument('--incremental', action='store_true', help='reuse cached bonded sections of archives with the same topology')
+    parser.add_argument('--compress', choices=[suffix[1:] for suffix in COMPRESSED_SUFFIXES], help='write compressed data files')
+    parser.add_argument('--write-workers', type=int, default=1, help='processes formatting the output of each archive (default: 1)')
+    args = parser.parse_args(argv)
+
+    report = convert_batch(args.tar_files,args.out_dir,workers=args.workers,skip_up_to_date=args.skip_up_to_date,
+                           stream=args.stream,chunk_size=args.chunk_size,
+                           cache_dir=None if args.no_cache else args.cache_dir,cache_max_bytes=int(args.cache_max_gb*2**30),
+                           incremental=args.incremental,compress=args.compress,write_workers=args.write_workers)
+    print(format_report(report))
+    return 1 if report['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
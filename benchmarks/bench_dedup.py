@@ -0,0 +1,62 @@
+"""
+Created on Sun Oct 18 2026
+
+Compare label dedup on tuples of strings (a dict keyed by label, as before
+label interning) with np.unique on integer-coded label rows, for growing
+numbers of types and atom type names of growing length.
+
+Usage:
+    python benchmarks/bench_dedup.py [--types 1000 100000] [--name-length 4 32]
+
+@author: Ilia Nikiforov
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MK_read.topology import LabelRegistry
+from MK_read.dedup_LAMMPS_data import type_label_remap
+
+# Distinct atom type names the labels are drawn from
+NUM_NAMES = 200
+
+def _string_remap(type_label):
+    """ Old -> new type id lookup of labels given as tuples of strings """
+    new_id = {}
+    remap = np.zeros(len(type_label)+1, dtype=np.intp)
+    for i, label in enumerate(type_label):
+        remap[i+1] = new_id.setdefault(label, len(new_id)+1)
+    return remap
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--types', type=int, nargs='+', default=[1000, 100000], help='dihedral types per run')
+    parser.add_argument('--name-length', type=int, nargs='+', default=[4, 32], help='characters per atom type name')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print('%10s %8s %12s %12s %10s' % ('types', 'name len', 'strings [s]', 'codes [s]', 'speedup'))
+    for num_type in args.types:
+        for name_length in args.name_length:
+            names = ['%0*d' % (name_length, i) for i in range(NUM_NAMES)]
+            # Half as many distinct labels as types
+            pool = rng.integers(0, NUM_NAMES, size=(max(num_type//2,1),4))
+            codes = pool[rng.integers(0, len(pool), size=num_type)]
+            string_label = [tuple(names[code] for code in row) for row in codes.tolist()]
+            coded_label = LabelRegistry(names).encode(string_label, 4)
+
+            start = time.perf_counter()
+            expected = _string_remap(string_label)
+            t_strings = time.perf_counter()-start
+            start = time.perf_counter()
+            _, _, remap = type_label_remap(coded_label, np.zeros((num_type,4)))
+            t_codes = time.perf_counter()-start
+            if not np.array_equal(remap, expected):
+                raise RuntimeError("Integer-coded dedup differs from string dedup")
+            print('%10d %8d %12.4f %12.4f %10.1f' % (num_type, name_length, t_strings, t_codes, t_strings/t_codes))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Created on Sun Oct 18 2026
+
+Wall time and peak RSS of read_LAMMPS_bonded reading through buffered file
+I/O versus a memory-mapped file, each in a fresh process. RSS of the mmap
+reader includes the file pages it touched, which the kernel can drop at any
+time.
+
+Usage:
+    python benchmarks/bench_mmap.py [--rows 1000000 10000000] [--tmpdir DIR]
+
+@author: Ilia Nikiforov
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MK_read.read_LAMMPS_data import read_LAMMPS_bonded
+from synthetic import write_synthetic_data, ROWS_PER_ATOM
+from harness import peak_rss, run_child
+
+def _child(mode, filename):
+    """ Read filename once and print wall time [s] and peak RSS [MB] of this process """
+    start = time.perf_counter()
+    read_LAMMPS_bonded(filename, use_mmap=(mode == 'mmap'))
+    seconds = time.perf_counter()-start
+    print(seconds, peak_rss())
+
+def _run(mode, filename):
+    return [float(x) for x in run_child(__file__, mode, filename).split()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10**6], help='total Atoms+Bonds+Angles+Dihedrals rows per file')
+    parser.add_argument('--tmpdir', default=None, help='directory for the synthetic files')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    print('%12s %10s %12s %12s %12s %12s' % ('rows', 'MB', 'file [s]', 'mmap [s]', 'file RSS MB', 'mmap RSS MB'))
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        filename = os.path.join(tmpdir, 'step3_input.data')
+        for rows in args.rows:
+            rows = write_synthetic_data(filename, int(rows/ROWS_PER_ATOM))
+            t_file, rss_file = _run('file', filename)
+            t_mmap, rss_mmap = _run('mmap', filename)
+            print('%12d %10.1f %12.2f %12.2f %12.1f %12.1f' % (rows, os.path.getsize(filename)/2**20, t_file, t_mmap, rss_file, rss_mmap))
+            os.remove(filename)
+
+if __name__ == '__main__':
+    main()
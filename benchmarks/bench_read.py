@@ -0,0 +1,68 @@
+"""
+Created on Sun Oct 18 2026
+
+Compare the line-by-line reader of the original release with the bulk
+section reader on synthetic data files
+
+Usage:
+    python benchmarks/bench_read.py [--rows 100000 1000000 10000000] [--tmpdir DIR]
+
+@author: Ilia Nikiforov
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MK_read.read_LAMMPS_data import read_LAMMPS_bonded
+from legacy_read_LAMMPS_data import read_LAMMPS_bonded as read_LAMMPS_bonded_legacy
+from synthetic import write_synthetic_data, ROWS_PER_ATOM
+from harness import timed
+
+# Interaction kinds the legacy reader knows
+LEGACY_KINDS = ('bond', 'angle', 'dihedral')
+
+def _legacy_tables(topology):
+    """ Topology content in the layout returned by the legacy reader: float arrays with the type in column 0 """
+    atom = np.column_stack([topology.atom[field] for field in topology.atom.dtype.names])
+    tables = {'atom': atom}
+    names = topology.registry.names
+    for kind in LEGACY_KINDS:
+        interactions = getattr(topology, kind)
+        tables[kind] = np.column_stack((interactions.rows['type'], interactions.rows['atom']))
+        tables[kind+'_label'] = [[names[code] for code in label] for label in interactions.label.tolist()]
+    return tables
+
+def _same(legacy, topology):
+    """ Whether the legacy tuple and the Topology hold the same data """
+    num_atom,num_bond,num_angle,num_dihedral,num_atom_type,num_bond_type,num_angle_type,num_dihedral_type, \
+            xlo,xhi,ylo,yhi,zlo,zhi,mass,labels,pair_coeff,atom,bond_coeff,bond_label,bond,angle_coeff,angle_label,angle,dihedral_coeff,dihedral_label,dihedral = legacy
+    tables = _legacy_tables(topology)
+    return (np.array_equal(topology.box, [[xlo,xhi],[ylo,yhi],[zlo,zhi]]) and np.array_equal(topology.mass, mass)
+            and list(topology.labels) == labels and np.array_equal(tables['atom'], atom)
+            and all(np.array_equal(tables[kind], table) and tables[kind+'_label'] == label
+                    for kind, table, label in (('bond',bond,bond_label), ('angle',angle,angle_label), ('dihedral',dihedral,dihedral_label))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10**5, 10**6], help='total Atoms+Bonds+Angles+Dihedrals rows per file')
+    parser.add_argument('--tmpdir', default=None, help='directory for the synthetic files')
+    args = parser.parse_args()
+
+    print('%12s %12s %12s %12s %8s' % ('rows', 'MB', 'legacy [s]', 'bulk [s]', 'speedup'))
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        for rows in args.rows:
+            filename = os.path.join(tmpdir, 'step3_input.data')
+            rows = write_synthetic_data(filename, int(rows/ROWS_PER_ATOM))
+            t_legacy, legacy = timed(read_LAMMPS_bonded_legacy, filename)
+            t_bulk, bulk = timed(read_LAMMPS_bonded, filename)
+            if not _same(legacy, bulk):
+                raise RuntimeError("Bulk reader result differs from the legacy reader for %d rows" % rows)
+            print('%12d %12.1f %12.2f %12.2f %8.1f' % (rows, os.path.getsize(filename)/2**20, t_legacy, t_bulk, t_legacy/t_bulk))
+            os.remove(filename)
+
+if __name__ == '__main__':
+    main()
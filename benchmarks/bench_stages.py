@@ -0,0 +1,90 @@
+"""
+Created on Sun Oct 18 2026
+
+Time the stages of converting a synthetic CHARMM-GUI archive: extract
+(decompress step3_input.data from the .tgz), parse (read_LAMMPS_bonded),
+dedup (dedup_type_labels of every kind) and write
+(write_LAMMPS_bonded_label_v2). Every size runs in a fresh process; the
+RSS column is the peak RSS of that process once the stage has finished,
+so a stage that raises it is the one setting the memory high-water mark.
+
+Usage:
+    python benchmarks/bench_stages.py [--atoms 1000 10000 100000 1000000 10000000] [--impropers] [--tmpdir DIR]
+
+@author: Ilia Nikiforov
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MK_read.read_LAMMPS_data import read_LAMMPS_bonded
+from MK_read.dedup_LAMMPS_data import dedup_type_labels
+from MK_read.write_LAMMPS_data import write_LAMMPS_bonded_label_v2
+from synthetic import write_synthetic_tgz, TGZ_MEMBER
+from harness import peak_rss, run_child
+
+STAGES = ('extract', 'parse', 'dedup', 'write')
+
+def _child(tar_file, out_file):
+    """ Convert tar_file once stage by stage and print seconds and peak RSS after every stage as JSON """
+    result = {}
+    start = time.perf_counter()
+    with tarfile.open(tar_file) as tar:
+        data = tar.extractfile(TGZ_MEMBER).read()
+    result['extract'] = (time.perf_counter()-start, peak_rss())
+
+    start = time.perf_counter()
+    topology = read_LAMMPS_bonded(io.BytesIO(data), pair_coeff=False)
+    result['parse'] = (time.perf_counter()-start, peak_rss())
+    result['data_bytes'] = len(data)
+    del data
+
+    start = time.perf_counter()
+    for kind, interactions in topology.interactions():
+        dedup_type_labels(interactions)
+    result['dedup'] = (time.perf_counter()-start, peak_rss())
+
+    start = time.perf_counter()
+    write_LAMMPS_bonded_label_v2(out_file, topology)
+    result['write'] = (time.perf_counter()-start, peak_rss())
+    print(json.dumps(result))
+
+def _run(tar_file, out_file):
+    return json.loads(run_child(__file__, tar_file, out_file))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--atoms', type=float, nargs='+', default=[1e3, 1e4, 1e5, 1e6, 1e7], help='atoms per synthetic system')
+    parser.add_argument('--impropers', action='store_true', help='include improper types and rows')
+    parser.add_argument('--tmpdir', default=None, help='directory for the synthetic archives and outputs')
+    parser.add_argument('--child', nargs=2, metavar=('TGZ', 'OUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    print('%10s %10s %8s  %s' % ('atoms', 'rows', 'data MB', '  '.join('%8s [s] %8s MB/s %7s RSS MB' % (stage, stage, stage) for stage in STAGES)))
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        tar_file = os.path.join(tmpdir, 'charmm-gui.tgz')
+        out_file = os.path.join(tmpdir, 'typelabel.data')
+        for num_atom in args.atoms:
+            num_atom = int(num_atom)
+            num_rows = write_synthetic_tgz(tar_file, num_atom, tmpdir=tmpdir, num_improper_type=60 if args.impropers else 0)
+            result = _run(tar_file, out_file)
+            data_mb = result['data_bytes']/2**20
+            columns = []
+            for stage in STAGES:
+                seconds, rss = result[stage]
+                columns.append('%12.3f %13.1f %14.1f' % (seconds, data_mb/seconds if seconds > 0 else 0.0, rss))
+            print('%10d %10d %8.1f  %s' % (num_atom, num_rows, data_mb, '  '.join(columns)))
+            os.remove(tar_file)
+            os.remove(out_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Created on Sun Oct 18 2026
+
+Round trip (read, dedup, write) on synthetic data files comparing the
+row-by-row writer of the original release with the batched writer.
+Fails if the two outputs are not byte-identical.
+
+Usage:
+    python benchmarks/bench_write.py [--rows 100000 1000000 10000000] [--tmpdir DIR]
+
+@author: Ilia Nikiforov
+"""
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MK_read.read_LAMMPS_data import read_LAMMPS_bonded
+from MK_read.dedup_LAMMPS_data import dedup_type_labels
+from MK_read.write_LAMMPS_data import write_LAMMPS_bonded_label_v2
+from legacy_write_LAMMPS_data import write_LAMMPS_bonded_label_v2 as write_LAMMPS_bonded_label_v2_legacy
+from synthetic import write_synthetic_data, ROWS_PER_ATOM
+from harness import timed
+
+# Interaction kinds the legacy writer knows
+LEGACY_KINDS = ('bond', 'angle', 'dihedral')
+
+def _read_dedup(filename):
+    """ Read and dedup as dump_dat does """
+    topology = read_LAMMPS_bonded(filename)
+    for kind, interactions in topology.interactions():
+        dedup_type_labels(interactions)
+    return topology
+
+def _legacy_args(topology):
+    """ Arguments of the legacy write_LAMMPS_bonded_label_v2 after filename """
+    atom = np.column_stack([topology.atom[field] for field in topology.atom.dtype.names])
+    legacy = [getattr(topology, kind) for kind in LEGACY_KINDS]
+    names = topology.registry.names
+    args = [topology.num_atom]+[interactions.count for interactions in legacy]
+    args += [topology.num_atom_type]+[interactions.num_type for interactions in legacy]
+    args += list(topology.box.ravel())+[topology.labels, atom]
+    for interactions in legacy:
+        label = [[names[code] for code in row] for row in interactions.label.tolist()]
+        args += [label, np.column_stack((interactions.rows['type'], interactions.rows['atom']))]
+    return args
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10**5, 10**6], help='total Atoms+Bonds+Angles+Dihedrals rows per file')
+    parser.add_argument('--tmpdir', default=None, help='directory for the synthetic and output files')
+    args = parser.parse_args()
+
+    print('%12s %12s %12s %12s %12s %8s' % ('rows', 'read [s]', 'read+dedup', 'legacy [s]', 'batched [s]', 'speedup'))
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        filename = os.path.join(tmpdir, 'step3_input.data')
+        golden = os.path.join(tmpdir, 'legacy.data')
+        output = os.path.join(tmpdir, 'batched.data')
+        for rows in args.rows:
+            rows = write_synthetic_data(filename, int(rows/ROWS_PER_ATOM))
+            t_read, _ = timed(read_LAMMPS_bonded, filename)
+            start = time.perf_counter()
+            topology = _read_dedup(filename)
+            t_dedup = time.perf_counter()-start
+            legacy_args = _legacy_args(topology)
+            t_legacy, _ = timed(write_LAMMPS_bonded_label_v2_legacy, golden, *legacy_args)
+            t_batched, _ = timed(write_LAMMPS_bonded_label_v2, output, topology)
+            if not filecmp.cmp(golden, output, shallow=False):
+                raise RuntimeError("Batched writer output differs from the legacy writer for %d rows" % rows)
+            print('%12d %12.2f %12.2f %12.2f %12.2f %8.1f' % (rows, t_read, t_dedup, t_legacy, t_batched, t_legacy/t_batched))
+            for name in (filename, golden, output):
+                os.remove(name)
+
+if __name__ == '__main__':
+    main()
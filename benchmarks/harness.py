@@ -0,0 +1,32 @@
+"""
+Created on Sun Oct 18 2026
+
+Timing and fresh-process helpers shared by the benchmarks
+
+Input:
+    Function to time, or benchmark script re-run with --child
+
+Output:
+    Wall time, peak RSS, or the standard output of the child process
+
+@author: Ilia Nikiforov
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+def timed(function, *args):
+    """ Wall time [s] of function(*args) and its result """
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter()-start, result
+
+def peak_rss():
+    """ Peak RSS of this process [MB] """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+def run_child(script, *args):
+    """ Run script with --child args in a fresh Python process, so that its peak RSS is its own, and return its standard output """
+    return subprocess.check_output([sys.executable, os.path.abspath(script), '--child']+[str(arg) for arg in args])
@@ -0,0 +1,106 @@
+"""
+Created on Sun Oct 18 2026
+
+Synthetic CHARMM-GUI style LAMMPS data files for benchmarking
+
+Input:
+    Number of atoms and number of types per interaction kind
+
+Output:
+    step3_input.data-like file with duplicate bonded type labels,
+    optionally wrapped in a CHARMM-GUI style .tgz archive
+
+@author: Ilia Nikiforov
+"""
+import io
+import os
+import tarfile
+import tempfile
+import numpy as np
+
+# Interaction rows per atom produced by write_synthetic_data (1 + 1 + 1.8 + 2.6)
+ROWS_PER_ATOM = 6.4
+
+# Member of the archives written by write_synthetic_tgz, matching convert.STEP3_DATA_PATTERN
+TGZ_MEMBER = 'charmm-gui-synthetic/lammps/step3_input.data'
+
+##################################################################
+# WRITE SYNTHETIC LAMMPS BONDED DATA FILE
+##################################################################
+def write_synthetic_data(filename, num_atom, num_atom_type=40, num_bond_type=120, num_angle_type=300, num_dihedral_type=600,
+                         num_improper_type=0, seed=0):
+    """ Write a data file laid out like step3_input.data, return the number of atom and interaction rows """
+    rng = np.random.default_rng(seed)
+    atom_names = ['T%d' % i for i in range(num_atom_type)]
+    # Interactions per atom, roughly those of a solvated CHARMM protein/membrane system
+    num_bond = num_atom
+    num_angle = (num_atom*9)//5
+    num_dihedral = (num_atom*13)//5
+    num_improper = num_atom//8 if num_improper_type > 0 else 0
+
+    def labels(num_type, width):
+        # Draw from a pool half the size of the type count so that labels repeat
+        pool = rng.integers(0, num_atom_type, size=(max(num_type//2,1),width))
+        return pool[rng.integers(0, len(pool), size=num_type)]
+
+    def interactions(num_rows, num_type, width):
+        rows = np.empty((num_rows,width+2), dtype=np.int64)
+        rows[:,0] = np.arange(1, num_rows+1)
+        rows[:,1] = rng.integers(1, num_type+1, size=num_rows)
+        rows[:,2:] = rng.integers(1, num_atom+1, size=(num_rows,width))
+        return rows
+
+    with open(filename, 'w') as fout:
+        fout.write('Created by CHARMM-GUI LAMMPS input generator (synthetic)\n\n')
+        fout.write('%12d atoms\n%12d bonds\n%12d angles\n%12d dihedrals\n%12d impropers\n\n' % (num_atom, num_bond, num_angle, num_dihedral, num_improper))
+        fout.write('%12d atom types\n%12d bond types\n%12d angle types\n%12d dihedral types\n%12d improper types\n\n' % (num_atom_type, num_bond_type, num_angle_type, num_dihedral_type, num_improper_type))
+        fout.write('%16.8f %16.8f xlo xhi\n%16.8f %16.8f ylo yhi\n%16.8f %16.8f zlo zhi\n\n' % (-60.0, 60.0, -60.0, 60.0, -45.0, 45.0))
+
+        fout.write('Masses\n\n')
+        for i in range(num_atom_type):
+            fout.write('%8d %10.5f # %s\n' % (i+1, rng.uniform(1.0, 40.0), atom_names[i]))
+        fout.write('\nPair Coeffs\n\n')
+        for i in range(num_atom_type):
+            fout.write('%8d %14.10f %14.10f %14.10f %14.10f # %s\n' % (i+1, rng.uniform(0.0, 0.5), rng.uniform(1.0, 4.0), rng.uniform(0.0, 0.5), rng.uniform(1.0, 4.0), atom_names[i]))
+
+        fout.write('\nAtoms\n\n')
+        atom = np.empty((num_atom,7))
+        atom[:,0] = np.arange(1, num_atom+1)
+        atom[:,1] = np.arange(num_atom)//20+1
+        atom[:,2] = rng.integers(1, num_atom_type+1, size=num_atom)
+        atom[:,3] = rng.uniform(-1.0, 1.0, size=num_atom)
+        atom[:,4:6] = rng.uniform(-60.0, 60.0, size=(num_atom,2))
+        atom[:,6] = rng.uniform(-45.0, 45.0, size=num_atom)
+        np.savetxt(fout, atom, fmt='%8d %8d %5d %10.6f %14.8f %14.8f %14.8f')
+
+        for name, width, num_coeff, num_type, num_rows in (('Bond',2,2,num_bond_type,num_bond),
+                                                           ('Angle',3,4,num_angle_type,num_angle),
+                                                           ('Dihedral',4,4,num_dihedral_type,num_dihedral),
+                                                           ('Improper',4,2,num_improper_type,num_improper)):
+            if num_type == 0:
+                continue
+            fout.write('\n%s Coeffs\n\n' % name)
+            for i, label in enumerate(labels(num_type, width)):
+                coeff = ' '.join('%10.4f' % x for x in rng.uniform(0.0, 300.0, size=num_coeff))
+                fout.write('%8d %s # %s\n' % (i+1, coeff, ' '.join(atom_names[j] for j in label)))
+            fout.write('\n%ss\n\n' % name)
+            np.savetxt(fout, interactions(num_rows, num_type, width), fmt='%8d')
+
+    return num_atom+num_bond+num_angle+num_dihedral+num_improper
+
+##################################################################
+# WRITE SYNTHETIC CHARMM-GUI ARCHIVE
+##################################################################
+def write_synthetic_tgz(tar_file, num_atom, tmpdir=None, **kwargs):
+    """ Write a .tgz holding a synthetic data file at TGZ_MEMBER, kwargs as for write_synthetic_data """
+    with tempfile.TemporaryDirectory(dir=tmpdir) as tmp:
+        filename = os.path.join(tmp, 'step3_input.data')
+        num_rows = write_synthetic_data(filename, num_atom, **kwargs)
+        with tarfile.open(tar_file, 'w:gz') as tar:
+            # Other files of the archive come first, as in CHARMM-GUI downloads
+            readme = b'Synthetic CHARMM-GUI archive\n'
+            info = tarfile.TarInfo('charmm-gui-synthetic/README')
+            info.size = len(readme)
+            tar.addfile(info, io.BytesIO(readme))
+            tar.add(filename, arcname=TGZ_MEMBER)
+    return num_rows
@@ -0,0 +1,154 @@
+"""
+Content-addressed cache of converted data files
+
+A converted data file is stored under the SHA-256 of the LAMMPS data file
+it was produced from (plus CONVERTER_VERSION), so archives regenerated with
+identical step3_input.data content skip parsing, dedup and writing.
+
+For incremental conversion, the bonded sections of a converted file are also
+stored under the topology fingerprint of its input (header counts and all
+sections but Atoms), so inputs that differ only in box and coordinates
+reuse them and convert just the header and the Atoms section.
+"""
+import glob
+import hashlib
+import os
+import shutil
+from .MK_read.compression import COMPRESSED_SUFFIXES, compression_suffix, open_compressed
+
+# Bump whenever the output of dump_dat changes for the same input
+CONVERTER_VERSION = '2'
+
+# Default size bound of the cache directory
+CACHE_MAX_BYTES = 20*2**30
+
+# Bytes hashed per read
+HASH_BLOCK = 2**20
+
+class ConversionCache:
+    """
+    Directory of converted data files named <sha256>.data, evicted least recently used first
+    Args:
+        cache_dir: cache directory, created if it doesn't exist
+        max_bytes: total size the directory is trimmed to after every store
+        hardlink: materialize hits as hard links instead of copies (falls back to copying across file systems)
+    """
+    def __init__(self,cache_dir,max_bytes=CACHE_MAX_BYTES,hardlink=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hardlink = hardlink
+        self.hits = 0
+        self.misses = 0
+        self.bonded_hits = 0
+        self.bonded_misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self,dat_in):
+        """ Hash of a data file (binary file object, read to the end) and the converter version """
+        sha = hashlib.sha256(('lmp-typelabel-dat/'+CONVERTER_VERSION+'\n').encode())
+        for block in iter(lambda: dat_in.read(HASH_BLOCK), b''):
+            sha.update(block)
+        return sha.hexdigest()
+
+    def _path(self,key,typelabel_dat):
+        """ Entry of key for the compression of typelabel_dat, stored compressed as it was written """
+        return os.path.join(self.cache_dir, key+'.data'+(compression_suffix(typelabel_dat) or ''))
+
+    def fetch(self,key,typelabel_dat):
+        """ Materialize the cached conversion for key at typelabel_dat, return False on a miss """
+        cached = self._path(key,typelabel_dat)
+        if not os.path.exists(cached):
+            self.misses += 1
+            return False
+        if os.path.exists(typelabel_dat):
+            raise RuntimeError ("Refusing to overwrite "+str(typelabel_dat))
+        try:
+            self._materialize(cached,typelabel_dat)
+        except FileNotFoundError:
+            # Evicted by a concurrent conversion since the exists check
+            self.misses += 1
+            return False
+        self._touch(cached)
+        self.hits += 1
+        return True
+
+    def store(self,key,typelabel_dat):
+        """ Add a freshly converted typelabel_dat to the cache and trim the cache to max_bytes """
+        # Write under a temporary name first so concurrent conversions never see a partial entry
+        tmp = self._path(key,typelabel_dat)+'.%d.tmp' % os.getpid()
+        self._materialize(typelabel_dat,tmp)
+        os.replace(tmp,self._path(key,typelabel_dat))
+        self._evict()
+
+    def _bonded_path(self,fingerprint):
+        return os.path.join(self.cache_dir, fingerprint+'-'+CONVERTER_VERSION+'.bonded')
+
+    def fetch_bonded(self,fingerprint,fout):
+        """ Copy the bonded sections cached for a topology fingerprint to the binary file fout, return False on a miss """
+        cached = self._bonded_path(fingerprint)
+        try:
+            fbonded = open(cached,'rb')
+        except FileNotFoundError:
+            self.bonded_misses += 1
+            return False
+        with fbonded:
+            shutil.copyfileobj(fbonded,fout,HASH_BLOCK)
+        self._touch(cached)
+        self.bonded_hits += 1
+        return True
+
+    def store_bonded(self,fingerprint,typelabel_dat,offset):
+        """ Cache the bonded sections of a converted typelabel_dat, starting at (uncompressed) byte offset, and trim the cache to max_bytes """
+        tmp = self._bonded_path(fingerprint)+'.%d.tmp' % os.getpid()
+        with (open_compressed(typelabel_dat,'rb') if compression_suffix(typelabel_dat) else open(typelabel_dat,'rb')) as fin, \
+             open(tmp,'wb') as fout:
+            fin.seek(offset)
+            shutil.copyfileobj(fin,fout,HASH_BLOCK)
+        os.replace(tmp,self._bonded_path(fingerprint))
+        self._evict()
+
+    def _touch(self,path):
+        """ Mark an entry as recently used, unless it has been evicted meanwhile """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _materialize(self,src,dst):
+        if self.hardlink:
+            try:
+                os.link(src,dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(src,dst)
+
+    def _entries(self):
+        entries = []
+        patterns = ['*.data', '*.bonded']+['*.data'+suffix for suffix in COMPRESSED_SUFFIXES]
+        for path in [path for pattern in patterns for path in glob.glob(os.path.join(self.cache_dir, pattern))]:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        """ Remove least recently used entries until the cache fits in max_bytes """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        """ Hit/miss counters of this instance and current size of the cache directory """
+        entries = self._entries()
+        return {'hits': self.hits, 'misses': self.misses, 'bonded_hits': self.bonded_hits, 'bonded_misses': self.bonded_misses,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
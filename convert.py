@@ -1,17 +1,76 @@
 import os
-import subprocess
-from .MK_read.main import dump_dat
+import contextlib
+import fnmatch
+import io
+import tarfile
+from .MK_read.main import dump_dat, label_topology, CHUNK_SIZE
+from .MK_read.instrument import stage
 from pathlib import Path
 
-def convert(tar_file,typelabel_dat):
+# Member of the CHARMM-GUI archive holding the LAMMPS data file
+STEP3_DATA_PATTERN = 'charmm-gui*/lammps/step3_input.data'
+
+def _find_step3_data(tar):
+    """ Return the TarInfo of the LAMMPS data file, reading archive headers only up to it """
+    for member in tar:
+        if member.isfile() and fnmatch.fnmatch(member.name, STEP3_DATA_PATTERN):
+            return member
+    raise RuntimeError("No "+STEP3_DATA_PATTERN+" in "+str(tar.name))
+
+@contextlib.contextmanager
+def open_step3_data(tar_file,report=None):
+    """ Yield the LAMMPS data file of a CHARMM-GUI archive (path, bytes or binary file object) as a binary file object """
+    if isinstance(tar_file,(bytes,bytearray,memoryview)):
+        tar_file = io.BytesIO(tar_file)
+    if isinstance(tar_file,(str,os.PathLike)):
+        tar = tarfile.open(tar_file)
+    else:
+        tar = tarfile.open(fileobj=tar_file)
+    with tar:
+        with stage(report,'extract'):
+            member = _find_step3_data(tar)
+        # The data file is parsed straight out of the archive, nothing is extracted to disk
+        with tar.extractfile(member) as dat_in:
+            yield dat_in
+
+def convert_topology(tar_file,workers=1,report=None):
+    """ Topology with merged type labels of the data file in a CHARMM-GUI archive (path, bytes or binary file object) """
+    with open_step3_data(tar_file,report) as dat_in:
+        return label_topology(dat_in,workers=workers,report=report)
+
+def convert(tar_file,typelabel_dat,stream=False,chunk_size=CHUNK_SIZE,cache=None,workers=1,report=None,incremental=False,
+            write_workers=None):
     """
     Get a typelabel-only (for usage with a KIM SM) data file from a CHARMM-GUI .tgz file
     Args:
-        tar_file: CHARMM-GUI tgz
-        typelabel_dat: path to data file to write. Parent dirs will be created if they don't exist
+        tar_file: CHARMM-GUI tgz (path, bytes or binary file object)
+        typelabel_dat: path to data file to write. Parent dirs will be created if they don't exist.
+            Or a text/binary file object to write to, which is left open
+        stream: convert in chunks of chunk_size rows, keeping memory use independent of system size
+        chunk_size: rows per chunk in streaming mode
+        cache: ConversionCache to look the data file up in and store the result to, None bypasses caching. Needs a typelabel_dat path
+        workers: processes parsing the data file, None uses all available CPUs
+        report: StageReport to record the time and memory of every stage in, None for no instrumentation.
+            Decompressing the data file is part of the parse stage, extract covers finding it in the archive
+        incremental: on a cache miss, reuse the bonded sections cached for a data file with the same topology and
+            different box/coordinates, converting only the header and Atoms. Needs a cache
+        write_workers: processes formatting the rows of the output, None uses all available CPUs (ignored in streaming mode)
     """
-    subprocess.check_output("tar --wildcards --strip-components=2 -xkf %s charmm-gui*/lammps/step3_input.data"%tar_file,shell=True)    
-    Path(os.path.dirname(typelabel_dat)).mkdir(parents=True, exist_ok=True)    
-    dump_dat('step3_input.data',typelabel_dat)
-    os.remove('step3_input.data')
-
+    if incremental and cache is None:
+        raise RuntimeError ("Incremental conversion needs a cache")
+    is_path = isinstance(typelabel_dat,(str,os.PathLike))
+    if cache is not None and not is_path:
+        raise RuntimeError ("Cached conversion needs an output path")
+    with open_step3_data(tar_file,report) as dat_in:
+        if is_path:
+            Path(os.path.dirname(typelabel_dat)).mkdir(parents=True, exist_ok=True)
+        if cache is not None:
+            with stage(report,'cache'):
+                key = cache.key(dat_in)
+                if cache.fetch(key,typelabel_dat):
+                    return
+        dump_dat(dat_in,typelabel_dat,stream=stream,chunk_size=chunk_size,workers=workers,report=report,
+                 bonded_cache=cache if incremental else None,write_workers=write_workers)
+        if cache is not None:
+            with stage(report,'cache'):
+                cache.store(key,typelabel_dat)
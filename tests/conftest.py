@@ -0,0 +1,39 @@
+"""
+Created on Sun Oct 18 2026
+
+Fixtures shared by the tests: the repository imported as a package (convert,
+cache and batch use relative imports) and small CHARMM-GUI-style archives.
+
+@author: Ilia Nikiforov
+"""
+import importlib
+import io
+import os
+import sys
+import tarfile
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(REPO_DIR))
+
+# Member of the archives written by make_tgz, matching convert.STEP3_DATA_PATTERN
+TGZ_MEMBER = 'charmm-gui-1234567890/lammps/step3_input.data'
+
+@pytest.fixture(scope='session')
+def package():
+    """ Import function of the repository's modules, e.g. package('convert') """
+    name = os.path.basename(REPO_DIR)
+    return lambda module: importlib.import_module(name+'.'+module)
+
+@pytest.fixture
+def make_tgz(tmp_path):
+    """ Write data (bytes of a data file) as the step3_input.data of a CHARMM-GUI style .tgz under tmp_path, return its path """
+    def make(data, name='charmm-gui.tgz'):
+        tar_file = tmp_path/name
+        tar_file.parent.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(tar_file, 'w:gz') as tar:
+            info = tarfile.TarInfo(TGZ_MEMBER)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        return tar_file
+    return make
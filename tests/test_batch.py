@@ -0,0 +1,48 @@
+"""
+Created on Sun Oct 18 2026
+
+convert_batch over small CHARMM-GUI style archives of the golden input:
+output names of archives sharing a name, and leftovers of failed jobs.
+
+@author: Ilia Nikiforov
+"""
+import os
+import pytest
+from test_golden import GOLDEN_INPUT, GOLDEN_OUTPUT
+
+@pytest.fixture
+def golden_data():
+    with open(GOLDEN_INPUT, 'rb') as fin, open(GOLDEN_OUTPUT, 'rb') as fgolden:
+        return fin.read(), fgolden.read()
+
+def test_same_archive_names(package, make_tgz, golden_data, tmp_path):
+    data, golden = golden_data
+    for run in ('run1', 'run2'):
+        make_tgz(data, os.path.join('runs', run, 'charmm-gui.tgz'))
+    out_dir = tmp_path/'out'
+    report = package('batch').convert_batch(str(tmp_path/'runs'/'*'/'charmm-gui.tgz'), out_dir, workers=1)
+    assert len(report['converted']) == 2 and not report['failed']
+    assert sorted(os.listdir(out_dir)) == ['run1_charmm-gui.data', 'run2_charmm-gui.data']
+    for name in os.listdir(out_dir):
+        assert (out_dir/name).read_bytes() == golden
+
+def test_indistinguishable_names(package, make_tgz, golden_data, tmp_path):
+    data, _ = golden_data
+    tar_files = [str(make_tgz(data, name)) for name in ('system.tgz', 'system.tar.gz')]
+    report = package('batch').convert_batch(tar_files, tmp_path/'out', workers=1, skip_up_to_date=True)
+    assert not report['converted'] and not report['skipped']
+    assert [tar_file for tar_file, error in report['failed']] == tar_files
+    assert 'is shared by' in report['failed'][0][1]
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_failed_job_leaves_no_output(package, make_tgz, golden_data, tmp_path, stream):
+    data, _ = golden_data
+    # One Bonds row that does not parse, after the Atoms have been written
+    bonds = data.index(b'\nBonds\n')
+    row = data.index(b'\n', data.index(b'\n', bonds+8)+1)+1
+    tar_file = make_tgz(data[:row]+b'       2 bad row\n'+data[data.index(b'\n', row)+1:], 'bad.tgz')
+    out_dir = tmp_path/'out'
+    for _ in range(2):
+        report = package('batch').convert_batch([tar_file], out_dir, workers=1, skip_up_to_date=True, stream=stream)
+        assert len(report['failed']) == 1 and not report['skipped']
+        assert os.listdir(out_dir) == []
@@ -0,0 +1,55 @@
+"""
+Created on Sun Oct 18 2026
+
+ConversionCache: hit and miss counting, refusing to overwrite an existing
+output on a hit, and least recently used eviction under a tiny max_bytes.
+
+@author: Ilia Nikiforov
+"""
+import io
+import os
+import pytest
+
+ENTRY_BYTES = 100
+
+@pytest.fixture
+def cache(package, tmp_path):
+    # Room for two entries
+    return package('cache').ConversionCache(tmp_path/'cache', max_bytes=2*ENTRY_BYTES+ENTRY_BYTES//2)
+
+def _store(cache, tmp_path, name):
+    """ Store a converted file of ENTRY_BYTES for the input name, return its key """
+    key = cache.key(io.BytesIO(name.encode()))
+    typelabel_dat = tmp_path/(name+'.data')
+    typelabel_dat.write_bytes(name.encode().ljust(ENTRY_BYTES, b'.'))
+    cache.store(key, typelabel_dat)
+    os.remove(typelabel_dat)
+    return key
+
+def test_hits_and_misses(cache, tmp_path):
+    key = _store(cache, tmp_path, 'a')
+    assert not cache.fetch(cache.key(io.BytesIO(b'b')), tmp_path/'b.data')
+    assert cache.fetch(key, tmp_path/'a.data')
+    assert (tmp_path/'a.data').read_bytes() == b'a'.ljust(ENTRY_BYTES, b'.')
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats()['entries'] == 1
+
+def test_refuse_overwrite_on_hit(cache, tmp_path):
+    key = _store(cache, tmp_path, 'a')
+    (tmp_path/'a.data').write_bytes(b'keep')
+    with pytest.raises(RuntimeError, match='Refusing to overwrite'):
+        cache.fetch(key, tmp_path/'a.data')
+    assert (tmp_path/'a.data').read_bytes() == b'keep'
+
+def test_evict_least_recently_used(cache, tmp_path):
+    key_a = _store(cache, tmp_path, 'a')
+    key_b = _store(cache, tmp_path, 'b')
+    # b was stored after a, but a was used last
+    os.utime(cache._path(key_a, 'a.data'), (1, 1))
+    os.utime(cache._path(key_b, 'b.data'), (2, 2))
+    assert cache.fetch(key_a, tmp_path/'a.data')
+    key_c = _store(cache, tmp_path, 'c')
+    assert cache.stats()['bytes'] <= cache.max_bytes
+    assert not os.path.exists(cache._path(key_b, 'b.data'))
+    assert os.path.exists(cache._path(key_a, 'a.data')) and os.path.exists(cache._path(key_c, 'c.data'))
+    assert not cache.fetch(key_b, tmp_path/'b.data')
@@ -0,0 +1,38 @@
+"""
+Created on Sun Oct 18 2026
+
+convert() of a CHARMM-GUI style archive around the golden input, from a
+path and from bytes, against the golden output.
+
+@author: Ilia Nikiforov
+"""
+import tarfile
+import pytest
+from test_golden import GOLDEN_INPUT, GOLDEN_OUTPUT
+
+def _golden():
+    with open(GOLDEN_OUTPUT, 'rb') as fgolden:
+        return fgolden.read()
+
+@pytest.fixture
+def golden_tgz(make_tgz):
+    with open(GOLDEN_INPUT, 'rb') as fin:
+        return make_tgz(fin.read())
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_convert_path(package, golden_tgz, tmp_path, stream):
+    dat_out = tmp_path/'out'/'typelabel.data'
+    package('convert').convert(golden_tgz, dat_out, stream=stream)
+    assert dat_out.read_bytes() == _golden()
+
+def test_convert_bytes(package, golden_tgz, tmp_path):
+    dat_out = tmp_path/'typelabel.data'
+    package('convert').convert(golden_tgz.read_bytes(), dat_out)
+    assert dat_out.read_bytes() == _golden()
+
+def test_no_data_file(package, tmp_path):
+    tar_file = tmp_path/'empty.tgz'
+    with tarfile.open(tar_file, 'w:gz'):
+        pass
+    with pytest.raises(RuntimeError, match='No charmm-gui'):
+        package('convert').convert(tar_file, tmp_path/'typelabel.data')
@@ -0,0 +1,139 @@
+"""
+Created on Sun Oct 18 2026
+
+Golden-file check of dump_dat: a small CHARMM-GUI-style data file converted
+in every mode must match, byte for byte, the output the original
+implementation wrote for it (data/step3_input.typelabel.data).
+data/step3_input_improper.data adds impropers with duplicate labels, which
+the original implementation dropped; its expected output is the original
+one plus the improper counts, Improper Type Labels and Impropers.
+
+Usage:
+    python -m pytest tests
+
+@author: Ilia Nikiforov
+"""
+import gzip
+import io
+import os
+import shutil
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MK_read import read_LAMMPS_data, write_LAMMPS_data
+from MK_read.main import dump_dat
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+GOLDEN_INPUT = os.path.join(DATA_DIR, 'step3_input.data')
+GOLDEN_OUTPUT = os.path.join(DATA_DIR, 'step3_input.typelabel.data')
+IMPROPER_INPUT = os.path.join(DATA_DIR, 'step3_input_improper.data')
+IMPROPER_OUTPUT = os.path.join(DATA_DIR, 'step3_input_improper.typelabel.data')
+
+def _golden():
+    with open(GOLDEN_OUTPUT, 'rb') as fgolden:
+        return fgolden.read()
+
+def _gzipped(tmp_path):
+    """ Path of a gzip-compressed copy of the golden input """
+    dat_in = tmp_path/'step3_input.data.gz'
+    with open(GOLDEN_INPUT, 'rb') as fin, gzip.open(dat_in, 'wb') as fout:
+        shutil.copyfileobj(fin, fout)
+    return dat_in
+
+def _write_input(tmp_path, data, compressed=False):
+    """ Path of a data file holding data, gzip-compressed if asked """
+    if compressed:
+        dat_in = tmp_path/'input.data.gz'
+        with gzip.open(dat_in, 'wb') as fout:
+            fout.write(data)
+    else:
+        dat_in = tmp_path/'input.data'
+        dat_in.write_bytes(data)
+    return dat_in
+
+def _converted(tmp_path, dat_in=GOLDEN_INPUT, **kwargs):
+    dat_out = tmp_path/'typelabel.data'
+    dump_dat(dat_in, dat_out, **kwargs)
+    return dat_out.read_bytes()
+
+def test_serial(tmp_path):
+    assert _converted(tmp_path, workers=1, write_workers=1) == _golden()
+
+@pytest.mark.parametrize('chunk_size', [1000, 7])
+def test_stream(tmp_path, chunk_size):
+    assert _converted(tmp_path, stream=True, chunk_size=chunk_size) == _golden()
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_mmap(tmp_path, stream):
+    assert _converted(tmp_path, use_mmap=True, stream=stream, chunk_size=7) == _golden()
+
+def test_parallel_writer(tmp_path, monkeypatch):
+    # Small blocks and no size threshold, so that the golden file is formatted by the process pool
+    monkeypatch.setattr(write_LAMMPS_data, 'WRITE_CHUNK', 16)
+    monkeypatch.setattr(write_LAMMPS_data, 'PARALLEL_MIN_ROWS', 0)
+    assert _converted(tmp_path, write_workers=2) == _golden()
+
+def test_default_workers(tmp_path, monkeypatch):
+    # Under taskset or a cgroup CPU limit only the CPUs of the affinity mask are used, not os.cpu_count()
+    monkeypatch.setattr(os, 'cpu_count', lambda: 64)
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: {0}, raising=False)
+    assert read_LAMMPS_data.available_cpus() == 1
+    with read_LAMMPS_data.open_parse_pool(GOLDEN_INPUT, None) as pool:
+        assert pool is None
+    monkeypatch.delattr(os, 'sched_getaffinity')
+    assert read_LAMMPS_data.available_cpus() == 64
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_compressed_input(tmp_path, stream):
+    # Read front to back in a single pass, the coefficient sections come after Atoms
+    assert _converted(tmp_path, _gzipped(tmp_path), stream=stream, chunk_size=7) == _golden()
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_parallel_parse(tmp_path, compressed):
+    # Workers read pieces of a path themselves, pieces of a decompressed stream are sent to them
+    dat_in = _gzipped(tmp_path) if compressed else GOLDEN_INPUT
+    assert _converted(tmp_path, dat_in, workers=2) == _golden()
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_text_output(stream):
+    # Streaming to a text file object, which has no binary buffer
+    dat_out = io.StringIO()
+    dump_dat(GOLDEN_INPUT, dat_out, stream=stream)
+    assert dat_out.getvalue().encode('ascii') == _golden()
+
+@pytest.mark.parametrize('kwargs', [{}, {'stream': True, 'chunk_size': 7}, {'use_mmap': True}, {'workers': 2}, {'gzip': True},
+                                    {'gzip': True, 'stream': True}])
+def test_truncated_input(tmp_path, kwargs):
+    # The last 50 Dihedrals rows are missing
+    with open(GOLDEN_INPUT, 'rb') as fin:
+        lines = fin.readlines()[:-50]
+    dat_in = _write_input(tmp_path, b''.join(lines), kwargs.pop('gzip', False))
+    with pytest.raises(RuntimeError, match="Section 'Dihedrals' of .* has 150 rows, expected 200"):
+        dump_dat(dat_in, tmp_path/'typelabel.data', **kwargs)
+
+@pytest.mark.parametrize('kwargs', [{}, {'stream': True}, {'use_mmap': True}, {'workers': 2}, {'gzip': True},
+                                    {'gzip': True, 'stream': True}, {'text': True}])
+def test_utf8_title(tmp_path, kwargs):
+    # The title line is free text, and comments may hold any text too
+    with open(GOLDEN_INPUT, 'rb') as fin:
+        data = fin.read()
+    data = 'Système créé par CHARMM-GUI # ½\n'.encode('utf-8')+data[data.index(b'\n')+1:]
+    data = data.replace(b'\nMasses\n', '\nMasses # Massen für Atomtypen\n'.encode('utf-8'), 1)
+    dat_in = _write_input(tmp_path, data, kwargs.pop('gzip', False))
+    if kwargs.pop('text', False):
+        dat_in = io.StringIO(data.decode('utf-8'))
+    assert _converted(tmp_path, dat_in, **kwargs) == _golden()
+
+@pytest.mark.parametrize('kwargs', [{'workers': 1, 'write_workers': 1}, {'stream': True, 'chunk_size': 7}, {'use_mmap': True},
+                                    {'use_mmap': True, 'stream': True}, {'workers': 2}, {'parallel_writer': True},
+                                    {'gzip': True}, {'gzip': True, 'stream': True, 'chunk_size': 7}])
+def test_impropers(tmp_path, monkeypatch, kwargs):
+    if kwargs.pop('parallel_writer', False):
+        monkeypatch.setattr(write_LAMMPS_data, 'WRITE_CHUNK', 16)
+        monkeypatch.setattr(write_LAMMPS_data, 'PARALLEL_MIN_ROWS', 0)
+        kwargs['write_workers'] = 2
+    with open(IMPROPER_INPUT, 'rb') as fin, open(IMPROPER_OUTPUT, 'rb') as fgolden:
+        data, golden = fin.read(), fgolden.read()
+    dat_in = _write_input(tmp_path, data, kwargs.pop('gzip', False))
+    assert _converted(tmp_path, dat_in, **kwargs) == golden
@@ -0,0 +1,69 @@
+"""
+Created on Sun Oct 18 2026
+
+Incremental conversion: a second input with the same topology but another
+box and other coordinates reuses the cached bonded sections, and its output
+matches a full conversion, for plain and .gz outputs and for an archive
+member (spooled to a temporary file before indexing).
+
+@author: Ilia Nikiforov
+"""
+import gzip
+import pytest
+from test_golden import GOLDEN_INPUT
+
+def _moved(data):
+    """ data with a larger box and every atom shifted, the topology unchanged """
+    lines = data.split(b'\n')
+    atoms = lines.index(b'Atoms')
+    for i, line in enumerate(lines):
+        if line.endswith(b'lo zhi') or line.endswith(b'lo yhi') or line.endswith(b'lo xhi'):
+            lo, hi, names = line.split(None, 2)
+            lines[i] = b'%.6f %.6f %s' % (float(lo)-1.5, float(hi)+1.5, names)
+    i = atoms+2
+    while lines[i].strip():
+        row, _, comment = lines[i].partition(b'#')
+        fields = row.split()
+        fields[4:7] = [b'%.8f' % (float(x)+0.25) for x in fields[4:7]]
+        lines[i] = b' '.join(fields)+(b' #'+comment if comment else b'')
+        i += 1
+    return b'\n'.join(lines)
+
+def _read(path):
+    with (gzip.open(path, 'rb') if path.suffix == '.gz' else open(path, 'rb')) as fin:
+        return fin.read()
+
+@pytest.fixture
+def inputs():
+    with open(GOLDEN_INPUT, 'rb') as fin:
+        first = fin.read()
+    second = _moved(first)
+    assert second != first
+    return first, second
+
+@pytest.mark.parametrize('suffix', ['', '.gz'])
+def test_dump_dat_reuses_bonded(package, inputs, tmp_path, suffix):
+    dump_dat = package('MK_read.main').dump_dat
+    cache = package('cache').ConversionCache(tmp_path/'cache')
+    first, second = inputs
+    (tmp_path/'first.data').write_bytes(first)
+    (tmp_path/'second.data').write_bytes(second)
+    dump_dat(tmp_path/'first.data', tmp_path/('first.out'+suffix), bonded_cache=cache)
+    assert (cache.bonded_hits, cache.bonded_misses) == (0, 1)
+    dump_dat(tmp_path/'second.data', tmp_path/('second.out'+suffix), bonded_cache=cache)
+    assert (cache.bonded_hits, cache.bonded_misses) == (1, 1)
+
+    dump_dat(tmp_path/'second.data', tmp_path/'full.out')
+    assert _read(tmp_path/('second.out'+suffix)) == (tmp_path/'full.out').read_bytes()
+    assert _read(tmp_path/('second.out'+suffix)) != _read(tmp_path/('first.out'+suffix))
+
+def test_convert_archive_member(package, make_tgz, inputs, tmp_path):
+    convert = package('convert').convert
+    cache = package('cache').ConversionCache(tmp_path/'cache')
+    first, second = inputs
+    convert(make_tgz(first, 'first.tgz'), tmp_path/'first.out', cache=cache, incremental=True)
+    convert(make_tgz(second, 'second.tgz'), tmp_path/'second.out', cache=cache, incremental=True)
+    assert (cache.hits, cache.bonded_hits, cache.bonded_misses) == (0, 1, 1)
+
+    convert(make_tgz(second, 'full.tgz'), tmp_path/'full.out')
+    assert (tmp_path/'second.out').read_bytes() == (tmp_path/'full.out').read_bytes()
@@ -0,0 +1,30 @@
+"""
+Created on Sun Oct 18 2026
+
+StageReport without the Unix-only resource module: the conversion modules
+still import, and stages are recorded with max_rss_mb None.
+
+@author: Ilia Nikiforov
+"""
+import logging
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_import_without_resource():
+    # sys.modules entry None makes "import resource" raise ImportError, as on Windows
+    code = "import sys; sys.modules['resource'] = None; sys.path.insert(0, sys.argv[1]); import MK_read.main"
+    subprocess.check_call([sys.executable, '-c', code, REPO_DIR])
+
+def test_report_without_resource(package, monkeypatch, caplog):
+    instrument = package('MK_read.instrument')
+    monkeypatch.setattr(instrument, 'resource', None)
+    report = instrument.StageReport()
+    with report.stage('parse', 10):
+        pass
+    assert report.as_dict()['stages'][0]['max_rss_mb'] is None
+    with caplog.at_level(logging.INFO, logger=instrument.__name__):
+        report.log()
+    assert 'max RSS n/a' in caplog.text